@@ -0,0 +1,153 @@
+"""
+This module has micro-benchmarks for the arcade machine purchasing program.
+
+Run it from this folder, optionally naming the benchmarks to execute:
+
+    python benchmarks.py [purchase_log history error_log ...]
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop1-ArcMach.
+
+Workshop1-ArcMach is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop1-ArcMach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop1-ArcMach. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import tempfile
+from time import perf_counter
+from datetime import datetime, timedelta
+from purchase_log import PurchaseLog
+from purchase_history import PurchaseHistory, parse_date
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import AsyncLog  # pylint: disable=wrong-import-position
+
+def bench_purchase_log(size=100_000):
+    """
+    Compare opening the history file for every purchase against the batched PurchaseLog.
+
+    Args:
+        size (int): Number of purchases to write.
+
+    Returns:
+        None
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "purchase_history.txt")
+
+        start = perf_counter()
+        for i in range(size):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now()} --- Client: Client {i}, Total Price: ${i % 700}\n")
+        open_per_write = perf_counter() - start
+        os.remove(path)
+
+        start = perf_counter()
+        with PurchaseLog(path) as log:
+            for i in range(size):
+                log.record(f"Client {i}", i % 700)
+        batched = perf_counter() - start
+
+    print(f"{'method':>16} {'purchases/s':>12}")
+    print(f"{'open per write':>16} {size / open_per_write:>12.0f}")
+    print(f"{'PurchaseLog':>16} {size / batched:>12.0f}")
+
+def bench_history(size=1_000_000):
+    """
+    Compare reading the whole history file against PurchaseHistory for the last page and a one-hour range.
+
+    Args:
+        size (int): Number of purchases in the history file.
+
+    Returns:
+        None
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "purchase_history.txt")
+        first = datetime(2020, 1, 1)
+        with PurchaseLog(path, max_pending=4096) as log:
+            for i in range(size):
+                log.record(f"Client {i}", i % 700, first + timedelta(seconds=60 * i))
+        start_date = first + timedelta(seconds=30 * size)
+        end_date = start_date + timedelta(hours=1)
+
+        start = perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        last_page = lines[-20:]
+        readlines_tail = perf_counter() - start
+        start = perf_counter()
+        in_range = [line for line in lines if start_date <= parse_date(line) <= end_date]
+        readlines_range = perf_counter() - start + readlines_tail
+
+        history = PurchaseHistory(path)
+        start = perf_counter()
+        assert history.tail(20) == [line.strip() for line in last_page]
+        streamed_tail = perf_counter() - start
+        start = perf_counter()
+        assert list(history.between(start_date, end_date)) == [line.strip() for line in in_range]
+        streamed_range = perf_counter() - start
+
+    print(f"{'method':>16} {'tail(20) s':>12} {'1h range s':>12}")
+    print(f"{'readlines':>16} {readlines_tail:>12.4f} {readlines_range:>12.4f}")
+    print(f"{'PurchaseHistory':>16} {streamed_tail:>12.4f} {streamed_range:>12.4f}")
+
+def bench_error_log(size=100_000):
+    """
+    Compare opening log.txt for every error, as AddGame did, against the background AsyncLog.
+
+    The caller time is how long the program waits for the errors to be logged,
+    the total time also waits until the last one is written.
+
+    Args:
+        size (int): Number of errors to log.
+
+    Returns:
+        None
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "log.txt")
+
+        start = perf_counter()
+        for i in range(size):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now()} --- ERROR. Game {i} is not valid.\n")
+        open_per_error = perf_counter() - start
+        os.remove(path)
+
+        log = AsyncLog(path, max_queue=size)
+        start = perf_counter()
+        for i in range(size):
+            log.log(f"ERROR. Game {i} is not valid.")
+        caller = perf_counter() - start
+        log.close()
+        total = perf_counter() - start
+        with open(path, "r", encoding="utf-8") as f:
+            assert sum(1 for _ in f) == size - log.get_dropped()
+
+    print(f"{'method':>16} {'caller s':>10} {'total s':>10} {'dropped':>8}")
+    print(f"{'open per error':>16} {open_per_error:>10.3f} {open_per_error:>10.3f} {0:>8}")
+    print(f"{'AsyncLog':>16} {caller:>10.3f} {total:>10.3f} {log.get_dropped():>8}")
+
+BENCHMARKS = {
+    "purchase_log": bench_purchase_log,
+    "history": bench_history,
+    "error_log": bench_error_log,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"\n# {name}")
+        BENCHMARKS[name]()
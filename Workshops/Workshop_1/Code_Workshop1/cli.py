@@ -19,14 +19,25 @@ You should have received a copy of the GNU General Public License
 along with Workshop1-ArcMach. If not, see <https://www.gnu.org/licenses/>. 
 """
 
-from datetime import datetime
+import sys
+import csv
+import atexit
+import time
 from machine_classes import VideogamesMachine
 from machine_classes import Client
+from purchase_log import PurchaseLog
+from purchase_history import PurchaseHistory
+
+purchase_log = PurchaseLog("purchase_history.txt")
+atexit.register(purchase_log.close)
 
 def record_purchase(client_name, price):
     """
     Record a purchase with the current date, client name, and price.
 
+    The purchase is written by the shared purchase log within a second, or
+    when the history is shown or the program exits.
+
     Args:
         client_name (str): The name of the client.
         price (float): The total price of the purchase.
@@ -34,29 +45,74 @@ def record_purchase(client_name, price):
     Returns:
         None
     """
-    with open("purchase_history.txt", "a", encoding="utf-8") as f:
-        f.write(f"{datetime.now()} --- Client: {client_name}, Total Price: ${price}\n")
+    purchase_log.record(client_name, price)
 
-def show_purchase_history():
+def import_purchases(csv_path):
     """
-    Display the purchase history from the file.
+    Record every purchase of a CSV file with client name and price columns.
+
+    All purchases go through the shared purchase log, so they are written in
+    batches. Rows whose price is not a number are skipped.
+
+    Args:
+        csv_path (str): Path of the CSV file.
 
     Returns:
         None
     """
+    start = time.perf_counter()
+    imported = 0
+    skipped = 0
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            try:
+                client_name, price = row[0].strip(), float(row[1])
+            except (IndexError, ValueError):
+                skipped += 1
+                continue
+            purchase_log.record(client_name, price)
+            imported += 1
+    purchase_log.commit()
+    elapsed = time.perf_counter() - start
+    print(f"Imported {imported} purchases ({skipped} rows skipped) in {elapsed:.2f} s.")
+
+def show_purchase_history(page_size=20):
+    """
+    Display the purchase history from the file, newest purchases first.
+
+    The history is streamed from the end of the file one page at a time, so
+    only the pages that are shown are read.
+
+    Args:
+        page_size (int): Number of purchases shown per page.
+
+    Returns:
+        None
+    """
+    purchase_log.commit()
     try:
-        with open("purchase_history.txt", "r", encoding="utf-8") as f:
-            history = f.readlines()
-            if history:
-                print("\nPurchase History:")
-                for line in history:
-                    print(line.strip())
-            else:
-                print("No purchase history found.")
+        pages = PurchaseHistory("purchase_history.txt").pages(page_size)
+        page = next(pages, None)
+        if page is None:
+            print("No purchase history found.")
+            return
+        print("\nPurchase History (newest first):")
+        while page is not None:
+            for line in page:
+                print(line)
+            page = next(pages, None)
+            if page is not None:
+                more = input("\nPress Enter to see older purchases or type 'q' to return to the menu: ")
+                if more.strip().lower() == "q":
+                    break
     except FileNotFoundError:
         print("No purchase history file found.")
 
 if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--import":
+        import_purchases(sys.argv[2])
+        sys.exit()
+
     print("Welcome, here you can buy the arcade video game machine of your choice")
 
     MENU = """
@@ -164,7 +220,7 @@ if __name__ == "__main__":
                 if selected_game in games:
                     game_name = games[selected_game]
                     if game_name not in selected_games:
-                        arcade_machine.AddGame(game_name)
+                        arcade_machine.AddGame(game_name, game_prices[game_name])
                         selected_games.add(game_name)
                         print(f"Added {game_name} to your machine.")
                     else:
@@ -174,7 +230,7 @@ if __name__ == "__main__":
                 else:
                     print("Invalid game option. Please choose again.")
 
-            arcade_machine.CalculatePrice(material_cost, game_prices)
+            arcade_machine.CalculatePrice(material_cost)
 
             while True:
                 print("\nPurchase Summary:")
@@ -188,8 +244,7 @@ if __name__ == "__main__":
                         print(f"- {game} (${game_prices[game]})")
                 else:
                     print("No games selected.")
-                total_game_cost = sum(game_prices[game] for game in arcade_machine.games)
-                print(f"Total Cost of Games: ${total_game_cost}")
+                print(f"Total Cost of Games: ${arcade_machine.games_price}")
                 print(f"Total Cost: ${arcade_machine.price}")
 
                 continue_option = input("\nWould you like to buy or cancel? (Type 'buy' to purchase or 'cancel' to return to the menu): ").strip().lower()
@@ -19,35 +19,48 @@ You should have received a copy of the GNU General Public License
 along with Workshop1-ArcMach. If not, see <https://www.gnu.org/licenses/>. 
 """
 
-from datetime import datetime
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
+
+error_log = get_log("log.txt")
 
 class VideogamesMachine():
     """
     This class represents the behavior of an arcade video game machine with its own methods and attributes.
     """
 
-    def __init__(self, material="unknown", games=None):
+    def __init__(self, material="unknown", games=None, game_prices=None):
         """
         Initialize the arcade machine with material, list of games, and price.
 
         Args:
             material (str): Material of the arcade machine.
             games (list): List of games to be added to the machine. Defaults to an empty list.
+            game_prices (dict): A dictionary where the keys are the names of the games and the values 
+            are their respective prices, used to price the games given. Games missing from it cost 0.
         """
         self.material = material
         self.games = games if games is not None else []
+        game_prices = game_prices if game_prices is not None else {}
+        self.game_prices = {game: game_prices.get(game, 0) for game in self.games}
+        self.games_price = sum(game_prices.get(game, 0) for game in self.games)
         self.price = 0
 
-    def AddGame(self, game: str):
+    def AddGame(self, game: str, game_price: float = 0):
         """
         Add a game to the list of games in the arcade machine.
 
         This method takes the name of a game as a string and appends it to
-        the list of games if the provided input is a string. If an error occurs,
-        it logs the error and informs the user.
+        the list of games if the provided input is a string. The price of
+        the game is kept and added to the running total of the games. If an error
+        occurs, it queues the error in the shared error log and informs the user.
 
         Args:
             game (str): The name of the game to add.
+            game_price (float): The price of the game.
 
         Returns:
             None
@@ -55,34 +68,59 @@ class VideogamesMachine():
         try:
             if isinstance(game, str):
                 self.games.append(game)
+                self.game_prices[game] = game_price
+                self.games_price += game_price
                 result = f"The game {game} has been added to the list of games. :D "
 
         except Exception as e:
             print(f"ERROR. {e}")
-            with open("log.txt", "a", encoding="utf-8") as f:
-                f.write(f"{datetime.now()} --- ERROR. {e}.\n")
+            error_log.log(f"ERROR. {e}.")
             result = f"The game {game} has not been added to the list of games. :( "
         print(result)
 
-    def CalculatePrice(self, material_price: float, game_prices: dict):
+    def RemoveGame(self, game: str):
+        """
+        Remove a game from the list of games in the arcade machine.
+
+        The price the game was added with is subtracted from the running total of the games.
+
+        Args:
+            game (str): The name of the game to remove.
+
+        Returns:
+            None
+        """
+        if game in self.games:
+            self.games.remove(game)
+            if game in self.games:
+                self.games_price -= self.game_prices.get(game, 0)
+            else:
+                self.games_price -= self.game_prices.pop(game, 0)
+
+    def CalculatePrice(self, material_price: float, game_prices: dict = None):
         """
         Calculate the total price of the arcade machine based on the selected material and games.
 
-        This method calculates the total cost of the arcade machine by summing the cost of the chosen 
-        material and the cost of all selected games. It updates the `price` attribute of the 
+        This method calculates the total cost of the arcade machine by adding the cost of the chosen 
+        material to the running total of the selected games, which AddGame and RemoveGame keep up 
+        to date. If a dictionary of prices is given, the games are priced with it instead, as 
+        before the running total existed. It updates the `price` attribute of the 
         `VideogamesMachine` instance to reflect the total cost.
 
         Args:
             material_price (float): The price of the selected material.
-            game_prices (dict): A dictionary where the keys are the names of the games and the values 
-            are their respective prices.
+            game_prices (dict): Optional dictionary where the keys are the names of the games and 
+            the values are their respective prices.
 
         Returns:
             None
         """
-        self.price = material_price
-        for game in self.games:
-            self.price += game_prices.get(game, 0)
+        if game_prices is None:
+            self.price = material_price + self.games_price
+        else:
+            self.price = material_price
+            for game in self.games:
+                self.price += game_prices.get(game, 0)
 
 class Client():
     """
@@ -0,0 +1,181 @@
+"""
+This module has a class to read the purchase history without loading the whole file.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop1-ArcMach.
+
+Workshop1-ArcMach is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop1-ArcMach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop1-ArcMach. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from bisect import bisect_left
+from datetime import datetime
+
+def parse_date(line: str):
+    """
+    Get the date of a purchase history line.
+
+    Args:
+        line (str): A line such as "2024-10-05 10:00:00.000000 --- Client: Ana, Total Price: $270".
+
+    Returns:
+        datetime: The date of the purchase, or None if the line has no valid date.
+    """
+    try:
+        return datetime.fromisoformat(line.split(" --- ", 1)[0])
+    except ValueError:
+        return None
+
+class PurchaseHistory():
+    """
+    This class represents a streaming reader of the purchase history file.
+
+    The newest purchases are read by seeking backwards from the end of the file.
+    Date-range queries use a sparse index with the date found at every `stride`
+    bytes of the file, so only the sampled lines and the matching range are read.
+    The file is expected to be appended in chronological order, as the CLI does.
+    """
+
+    def __init__(self, path="purchase_history.txt", stride=64 * 1024, block_size=8 * 1024):
+        """
+        Initialize the reader.
+
+        Args:
+            path (str): Path of the purchase history file.
+            stride (int): Bytes between two samples of the sparse date index.
+            block_size (int): Bytes read at a time when reading backwards.
+        """
+        self.path = path
+        self.stride = stride
+        self.block_size = block_size
+        self._index = []  # sorted (date, offset) samples
+        self._indexed_size = 0
+
+    def _reverse_lines(self):
+        """
+        Yield the lines of the file from the last one to the first one.
+        """
+        with open(self.path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                size = min(self.block_size, position)
+                position -= size
+                f.seek(position)
+                block = f.read(size) + remainder
+                lines = block.split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line.decode("utf-8").strip()
+            if remainder.strip():
+                yield remainder.decode("utf-8").strip()
+
+    def tail(self, n=20):
+        """
+        Get the newest purchases.
+
+        Args:
+            n (int): Number of purchases to return.
+
+        Returns:
+            list: Up to n lines, oldest first.
+        """
+        lines = []
+        for line in self._reverse_lines():
+            if len(lines) == n:
+                break
+            lines.append(line)
+        return lines[::-1]
+
+    def pages(self, page_size=20, newest_first=True):
+        """
+        Iterate over the purchase history one page at a time.
+
+        Args:
+            page_size (int): Number of purchases per page.
+            newest_first (bool): True to start with the newest purchases.
+
+        Yields:
+            list: The lines of each page, in the order they are read.
+        """
+        if newest_first:
+            lines = self._reverse_lines()
+        else:
+            lines = self._forward_lines(0)
+        page = []
+        for line in lines:
+            page.append(line)
+            if len(page) == page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _forward_lines(self, offset):
+        """
+        Yield the lines of the file starting at a byte offset.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    yield line.decode("utf-8").strip()
+
+    def _update_index(self):
+        """
+        Sample the date of the first line after every stride bytes not indexed yet.
+        """
+        size = os.path.getsize(self.path)
+        if size < self._indexed_size:  # the file was truncated or replaced
+            self._index = []
+            self._indexed_size = 0
+        with open(self.path, "rb") as f:
+            sample = self._indexed_size
+            while sample < size:
+                f.seek(sample)
+                if sample > 0:
+                    f.readline()  # skip the partial line
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # the last line is still being written
+                date = parse_date(line.decode("utf-8"))
+                if date is not None and (not self._index or self._index[-1][1] < offset):
+                    self._index.append((date, offset))
+                sample += self.stride
+            self._indexed_size = sample
+
+    def between(self, start, end):
+        """
+        Get the purchases made in a date range.
+
+        Args:
+            start (datetime): First date included.
+            end (datetime): Last date included.
+
+        Yields:
+            str: The lines of the purchases in the range, oldest first.
+        """
+        self._update_index()
+        position = bisect_left(self._index, (start,))
+        offset = self._index[position - 1][1] if position > 0 else 0
+        for line in self._forward_lines(offset):
+            date = parse_date(line)
+            if date is None or date < start:
+                continue
+            if date > end:
+                break
+            yield line
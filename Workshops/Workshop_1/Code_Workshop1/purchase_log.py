@@ -0,0 +1,128 @@
+"""
+This module has a class to write the purchase history in batches.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop1-ArcMach.
+
+Workshop1-ArcMach is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop1-ArcMach is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop1-ArcMach. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+from datetime import datetime
+
+class PurchaseLog():
+    """
+    This class represents a writer of the purchase history file that keeps it open and batches appends.
+
+    Pending purchases are written when max_pending of them are waiting, and
+    a background timer writes the rest max_delay seconds after the first of
+    them was recorded, so no purchase waits longer than that for a write.
+    """
+
+    def __init__(self, path="purchase_history.txt", max_pending=256, max_delay=1.0):
+        """
+        Initialize the writer. The file is opened on the first write.
+
+        Args:
+            path (str): Path of the purchase history file.
+            max_pending (int): Number of pending purchases that triggers a write.
+            max_delay (float): Seconds a pending purchase waits at most before it is written.
+        """
+        self.path = path
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self._file = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def record(self, client_name: str, price: float, date: datetime = None):
+        """
+        Record a purchase with its date, client name, and price.
+
+        The purchase is kept in memory and written together with others
+        once max_pending purchases are waiting or by the timer, at most
+        max_delay seconds later.
+
+        Args:
+            client_name (str): The name of the client.
+            price (float): The total price of the purchase.
+            date (datetime): The date of the purchase. Defaults to now.
+
+        Returns:
+            None
+        """
+        if date is None:
+            date = datetime.now()
+        line = f"{date} --- Client: {client_name}, Total Price: ${price}\n"
+        with self._lock:
+            self._pending.append(line)
+            if len(self._pending) >= self.max_pending:
+                self._write()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def commit(self):
+        """
+        Write every pending purchase to the file with a single write and flush it.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._write()
+
+    def close(self):
+        """
+        Commit the pending purchases, stop the timer and close the file.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._write()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _on_timer(self):
+        """
+        Write the pending purchases when max_delay has passed, called by the timer thread.
+        """
+        with self._lock:
+            self._timer = None
+            self._write()
+
+    def _write(self):
+        """
+        Write the pending purchases with a single write, the lock must be held.
+        """
+        if self._pending:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(self._pending))
+            self._file.flush()
+            self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,974 @@
+"""
+This module has micro-benchmarks for the data structures of the application.
+
+Run it from this folder, optionally naming the benchmarks to execute:
+
+    python benchmarks.py [catalog memory ledger orders factory fleet machine render catalog_store
+                          search query topk variants quotes server catalog_stress catalog_threads
+                          bulk_quotes deliveries ...]
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import io
+import json
+import pickle
+import copyreg
+import asyncio
+import random
+import tempfile
+import threading
+import tracemalloc
+from time import perf_counter
+from datetime import datetime, timedelta
+from contextlib import nullcontext
+from videogames import VideoGame
+from catalog import Catalog
+from catalogStore import CatalogStore
+from concurrentCatalog import ConcurrentCatalog
+from search import SearchIndex, tokenize
+from ledger import MachineLedger, format_machine_line
+from machineQuery import search_machines
+from binaryLedger import BinaryMachineLedger, convert_text_ledger
+from users import Client, Address
+from factoryMachines import MATERIALS, MACHINE_SPECS, PredefinedMachines
+from deliveryStore import DeliveryStore
+from orders import OrderEngine, OrderSpec
+from bulkQuotes import quote_file
+from fleet import Fleet
+from machines import MATERIAL_ADJUSTMENTS, DanceRevolution
+from server import SalesServer
+
+CATEGORIES = ["dance", "classical", "shooter", "races", "vr"]
+
+
+def make_videogames(size: int) -> list:
+    """This function builds a list of synthetic videogames.
+
+    Args:
+        size (int): Number of videogames to build.
+
+    Returns:
+        A list of VideoGame with codes from 0 to size - 1.
+    """
+    rng = random.Random(size)
+    return [
+        VideoGame(code, f"Game {code}", "Synthetic game", "Studio", "Studio",
+                  CATEGORIES[code % len(CATEGORIES)], round(rng.uniform(5, 80), 2), 1980 + code % 45)
+        for code in range(size)
+    ]
+
+
+def timed(function, *args) -> float:
+    """This function returns the seconds spent running function(*args)."""
+    start = perf_counter()
+    function(*args)
+    return perf_counter() - start
+
+
+# ========== Catalog ========== #
+def bench_catalog(sizes=(10_000, 100_000, 1_000_000), operations=200):
+    """This function compares the list catalog against the indexed Catalog.
+
+    For every size it times `operations` lookups, removals and insertions
+    by code, which is what add, remove and add-to-machine do per action.
+    """
+    print(f"{'games':>10} {'operation':>10} {'list (ms)':>12} {'Catalog (ms)':>14} {'speedup':>9}")
+    for size in sizes:
+        videogames = make_videogames(size)
+        rng = random.Random(0)
+        codes = [rng.randrange(size) for _ in range(operations)]
+
+        as_list = list(videogames)
+        catalog = Catalog()
+        for vg in videogames:
+            catalog.add(vg)
+
+        def list_lookup():
+            for code in codes:
+                for i, vg in enumerate(as_list):
+                    if vg.get_code() == code:
+                        break
+
+        def catalog_lookup():
+            for code in codes:
+                catalog.get(code)
+
+        def list_remove_insert():
+            for code in codes:
+                for i, vg in enumerate(as_list):
+                    if vg.get_code() == code:
+                        as_list.append(as_list.pop(i))
+                        break
+
+        def catalog_remove_insert():
+            for code in codes:
+                catalog.add(catalog.remove(code))
+
+        for name, baseline, indexed in (("lookup", list_lookup, catalog_lookup),
+                                        ("remove+add", list_remove_insert, catalog_remove_insert)):
+            slow = timed(baseline)
+            fast = timed(indexed)
+            print(f"{size:>10} {name:>10} {slow * 1000:>12.2f} {fast * 1000:>14.3f} {slow / fast:>8.0f}x")
+
+
+# ========== VideoGame memory ========== #
+class DictVideoGame:
+    """VideoGame layout before __slots__: eight attributes in a per-instance __dict__."""
+
+    def __init__(self, code: int, name: str, description: str, storytelling_creator: str,
+                 graphics_creator: str, category: str, price: float, year: int):
+        self.__code = code
+        self.__name = name
+        self.__description = description
+        self.__storytelling_creator = storytelling_creator
+        self.__graphics_creator = graphics_creator
+        self.__category = category
+        self.__price = price
+        self.__year = year
+
+
+def bench_memory(sizes=(10_000, 100_000, 1_000_000)):
+    """This function compares the memory used by slotted and dict-based videogames.
+
+    The field values are shared between both runs, so the figures only
+    reflect the per-instance overhead of each layout. On CPython 3.11 a
+    videogame takes about 120 bytes against 152 with a __dict__, 21% less.
+    """
+    print(f"{'games':>10} {'__dict__ (MB)':>14} {'__slots__ (MB)':>15} {'bytes/game':>18}")
+    for size in sizes:
+        rows = [(code, f"Game {code}", "Synthetic game", "Studio", "Studio",
+                 CATEGORIES[code % len(CATEGORIES)], float(code), 1980 + code % 45)
+                for code in range(size)]
+        used = []
+        for cls in (DictVideoGame, VideoGame):
+            tracemalloc.start()
+            instances = [cls(*row) for row in rows]
+            used.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del instances
+        before, after = used
+        print(f"{size:>10} {before / 2**20:>14.1f} {after / 2**20:>15.1f} "
+              f"{before / size:>8.0f} -> {after / size:>5.0f}")
+
+
+# ========== Sales ledger ========== #
+def bench_ledger(sizes=(100_000, 1_000_000)):
+    """This function compares a price range search over the text and binary ledgers."""
+    rng = random.Random(0)
+    print(f"{'sales':>10} {'text parse+search (s)':>22} {'binary scan (s)':>16} {'MB/s':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            text_path = os.path.join(folder, "registered_machines.txt")
+            binary_path = os.path.join(folder, "registered_machines.bin")
+            with open(text_path, "w", encoding="utf-8") as file:
+                for _ in range(size):
+                    file.write(f"{rng.choice(CATEGORIES).capitalize()}, "
+                               f"{rng.choice(['Wood', 'Aluminium', 'Carbon_fiber'])}, "
+                               f"{rng.choice(['Red', 'Blue', 'Black'])}, ${rng.uniform(500, 9000):.2f}\n")
+            convert_text_ledger(text_path, binary_path)
+
+            def text_search():
+                ledger = MachineLedger(text_path)
+                ledger.refresh()
+                return ledger.search(1000, 1100)
+
+            binary = BinaryMachineLedger(binary_path)
+            slow = timed(text_search)
+            fast = timed(lambda: list(binary.scan(1000, 1100)))
+            megabytes = os.path.getsize(binary_path) / 2**20
+            print(f"{size:>10} {slow:>22.2f} {fast:>16.3f} {megabytes / fast:>8.0f}")
+
+
+# ========== Batch orders ========== #
+def make_orders(size: int, catalog_size: int) -> list:
+    """This function builds synthetic JSON orders against make_videogames(catalog_size)."""
+    rng = random.Random(size)
+    orders = []
+    for _ in range(size):
+        category = rng.randrange(len(CATEGORIES))
+        games = rng.sample(range(category, catalog_size, len(CATEGORIES)), 3)
+        orders.append({"category": CATEGORIES[category], "material": rng.choice(MATERIALS),
+                       "color": rng.choice(["red", "blue", "black"]), "games": games,
+                       "high_definition": [rng.random() < 0.5 for _ in games], "address": 1})
+    return orders
+
+
+def bench_orders(sizes=(1_000, 10_000)):
+    """This function reports the orders per second of OrderEngine.process_file."""
+    catalog = Catalog()
+    for vg in make_videogames(1_000):
+        catalog.add(vg)
+    client = Client(1, "Batch", "batch@example.com", "3001234567", Address("Street 1", 110111, "Bogota", "Colombia"))
+    print(f"{'orders':>10} {'placed':>8} {'seconds':>9} {'orders/s':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            orders_path = os.path.join(folder, "orders.jsonl")
+            with open(orders_path, "w", encoding="utf-8") as file:
+                for order in make_orders(size, 1_000):
+                    file.write(json.dumps(order) + "\n")
+            with DeliveryStore(os.path.join(folder, "deliveries"), batch_size=1_000) as deliveries:
+                engine = OrderEngine(catalog, client, os.path.join(folder, "registered_machines.txt"), deliveries)
+                report = engine.process_file(orders_path)
+            print(f"{size:>10} {report['placed']:>8} {report['seconds']:>9.2f} {report['orders_per_second']:>10.0f}")
+
+
+# ========== Machine factory ========== #
+def bench_factory(size=200_000):
+    """This function reports the machines created per second by the factory.
+
+    The baseline builds every machine from its specification and adjusts
+    it by material, which is what create_machine did before prototypes.
+    """
+    rng = random.Random(0)
+    specs = [(rng.choice(CATEGORIES), "red", rng.choice(MATERIALS)) for _ in range(size)]
+    factory = PredefinedMachines()
+
+    def from_scratch():
+        machines = []
+        for category, color, material in specs:
+            cls, dimensions, weight, power, memory, processors, base_price, extras = MACHINE_SPECS[category]
+            machine = cls(material, list(dimensions), weight, power, memory, processors, base_price, color, *extras)
+            machine.adjustmentsByMaterial()
+            machines.append(machine)
+        return machines
+
+    def one_by_one():
+        return [factory.create_machine(category, color, material) for category, color, material in specs]
+
+    print(f"{'method':>16} {'machines/s':>12}")
+    for name, function in (("from scratch", from_scratch), ("create_machine", one_by_one),
+                           ("create_machines", lambda: factory.create_machines(specs))):
+        print(f"{name:>16} {size / timed(function):>12.0f}")
+
+
+# ========== Fleet repricing ========== #
+def bench_fleet(sizes=(100_000, 1_000_000)):
+    """This function compares per-object material adjustment with the vectorized fleet.
+
+    It also checks that both give exactly the same weight, price and power.
+    """
+    rng = random.Random(0)
+    factory = PredefinedMachines()
+    print(f"{'machines':>10} {'per object (s)':>15} {'fleet (s)':>10} {'speedup':>8} {'exact':>6}")
+    for size in sizes:
+        specs = [(rng.choice(CATEGORIES), rng.choice(MATERIALS)) for _ in range(size)]
+        fleet = Fleet(specs)
+
+        def per_object():
+            machines = []
+            for category, material in specs:
+                cls, dimensions, weight, power, memory, processors, base_price, extras = MACHINE_SPECS[category]
+                machine = cls(material, dimensions, weight, power, memory, processors, base_price, None, *extras)
+                machine.adjustmentsByMaterial()
+                machines.append(machine)
+            return machines
+
+        start = perf_counter()
+        machines = per_object()
+        slow = perf_counter() - start
+        start = perf_counter()
+        weights, prices, powers = fleet.adjusted()
+        fast = perf_counter() - start
+
+        exact = all(machine.get_weight() == weight and machine.get_price() == price
+                    and machine.get_power_consumption() == power
+                    for machine, weight, price, power in zip(machines, weights, prices, powers))
+        print(f"{size:>10} {slow:>15.2f} {fast:>10.3f} {slow / fast:>7.0f}x {str(exact):>6}")
+
+
+# ========== Machine videogames ========== #
+class LegacyPickler(pickle.Pickler):
+    """Pickles some objects as their class plus a given attribute dictionary.
+
+    Before __slots__, indexes and caches, machines and videogames were
+    pickled as their class plus their attribute dictionary, this is how
+    the files of those versions are reproduced.
+    """
+
+    def __init__(self, file, states: dict):
+        super().__init__(file)
+        self.states = states  # id of an object -> its attribute dictionary in the old layout
+
+    def reducer_override(self, obj):
+        state = self.states.get(id(obj))
+        if state is None:
+            return NotImplemented
+        return (copyreg.__newobj__, (type(obj),), state)
+
+
+def legacy_pickle(obj, states: dict) -> bytes:
+    """This function pickles an object whose parts in states are written in their old layout."""
+    file = io.BytesIO()
+    LegacyPickler(file, states).dump(obj)
+    return file.getvalue()
+
+
+def legacy_videogame(states: dict, code: int, price: float) -> VideoGame:
+    """This function returns a dance videogame that legacy_pickle writes in the layout of the first version."""
+    videogame = object.__new__(VideoGame)
+    fields = {"code": code, "name": f"Old game {code}", "description": "Old", "storytelling_creator": "Studio",
+              "graphics_creator": "Studio", "category": "dance", "price": price, "year": 2001}
+    states[id(videogame)] = {f"_VideoGame__{name}": value for name, value in fields.items()}
+    return videogame
+
+
+def legacy_machine(states: dict, videogames: list) -> DanceRevolution:
+    """This function returns a dance machine that legacy_pickle writes in the layout of the first version.
+
+    Its videogames are a list and it has neither a videogames total nor
+    a cached summary.
+    """
+    machine = object.__new__(DanceRevolution)
+    states[id(machine)] = {
+        "material": "wood", "_Machine__dimensions": [200, 100, 250], "_Machine__weight": 110.0,
+        "_Machine__power_consumption": 230.0, "_Machine__memory": 1024, "_Machine__processors": "Intel",
+        "_Machine__base_price": 3000.0, "_Machine__price": 2850.0, "_Machine__videogames": videogames,
+        "color": "red", "_DanceRevolution__price": 3400.0, "_DanceRevolution__difficulties": ["easy", "hard"],
+        "_DanceRevolution__arrow_cardinalities": ["up", "down"], "_DanceRevolution__controls_price": 400.0,
+    }
+    return machine
+
+
+def legacy_delivery_pickle(states: dict, client: Client, address: Address, machine) -> bytes:
+    """This function pickles a delivery as main.py of the first version did.
+
+    Delivery was defined in main.py, run as a script, so the files name
+    it __main__.Delivery, and it was pickled with its attribute dictionary.
+    """
+    main_module = sys.modules["__main__"]
+    legacy_class = type("Delivery", (), {"__module__": "__main__"})
+    delivery = object.__new__(legacy_class)
+    states[id(delivery)] = {"_Delivery__client_info": client, "_Delivery__address": address,
+                            "_Delivery__machine": machine}
+    previous = getattr(main_module, "Delivery", None)
+    main_module.Delivery = legacy_class
+    try:
+        return legacy_pickle(delivery, states)
+    finally:
+        if previous is None:
+            del main_module.Delivery
+        else:
+            main_module.Delivery = previous
+
+
+def check_legacy_machine():
+    """This function checks that a machine pickled by the first version can be printed, priced and changed."""
+    states = {}
+    videogames = [legacy_videogame(states, 1, 20.0), legacy_videogame(states, 2, 35.5)]
+    machine = pickle.loads(legacy_pickle(legacy_machine(states, videogames), states))
+    assert [vg.get_code() for vg in machine.get_videogames()] == [1, 2]
+    assert machine.get_videogames_price() == 55.5
+    assert machine.get_total_price() == 2850.0 + 55.5
+    assert "Old game 2" in str(machine) and "Controls Price: $400.00" in str(machine)
+    machine.remove_videogame(1)
+    assert machine.get_total_price() == 2850.0 + 35.5
+    assert "Old game 1" not in str(machine)
+
+
+def bench_machine(sizes=(10_000, 20_000)):
+    """This function compares a list of games against the code-indexed games of a machine.
+
+    The baseline scans a list by code for membership and removal, which
+    is what Machine.remove_videogame did before its games were indexed.
+    A machine pickled with its games in a list is loaded first.
+    """
+    check_legacy_machine()
+    factory = PredefinedMachines()
+    print(f"{'titles':>10} {'list (s)':>10} {'Machine (s)':>12} {'speedup':>8}")
+    for size in sizes:
+        videogames = [vg for vg in make_videogames(size * len(CATEGORIES)) if vg.get_category() == "vr"]
+        codes = [vg.get_code() for vg in videogames]
+        rng = random.Random(0)
+        rng.shuffle(codes)
+
+        def with_list():
+            games = []
+            for vg in videogames:
+                games.append(vg)
+            for code in codes:
+                for i, game in enumerate(games):
+                    if game.get_code() == code:
+                        games.pop(i)
+                        break
+
+        def with_machine():
+            machine = factory.create_machine("vr", "red", "wood")
+            for vg in videogames:
+                machine.add_videogame(vg)
+            for code in codes:
+                machine.remove_videogame(code)
+
+        slow = timed(with_list)
+        fast = timed(with_machine)
+        print(f"{size:>10} {slow:>10.2f} {fast:>12.3f} {slow / fast:>7.0f}x")
+
+
+# ========== Delivery files ========== #
+def bench_deliveries(size=1_000):
+    """This function imports delivery files of the first version and reads them back.
+
+    Every file holds a delivery pickled as the first version did, with
+    a machine whose videogames are a list. Once imported, the deliveries
+    of a client must be printable and priced as when they were sold.
+    """
+    address = Address("Street 1", 110111, "Bogota", "Colombia")
+    client = Client(7, "Old client", "old@example.com", "3001234567", address)
+    date = datetime(2024, 10, 5, 10, 10, 10)
+    with tempfile.TemporaryDirectory() as folder:
+        for number in range(size):
+            states = {}
+            videogames = [legacy_videogame(states, 2 * number, 20.0), legacy_videogame(states, 2 * number + 1, 35.5)]
+            payload = legacy_delivery_pickle(states, client, address, legacy_machine(states, videogames))
+            name = f"delivery_{(date + timedelta(seconds=number)).strftime('%Y-%m-%d_%H%M%S')}_            7.pkl"
+            with open(os.path.join(folder, name), "wb") as file:
+                file.write(payload)
+        with open(os.path.join(folder, "delivery_2024-10-05_000000_            7.pkl"), "wb") as file:
+            file.write(pickle.dumps(["not", "a", "delivery"]))
+
+        with DeliveryStore(os.path.join(folder, "deliveries")) as deliveries:
+            imported = timed(deliveries.import_pickle_files, folder)
+            start = perf_counter()
+            loaded = deliveries.by_client(7)
+            read = perf_counter() - start
+        assert len(loaded) == size, f"{len(loaded)} deliveries imported, expected {size}"
+        for number, delivery in enumerate(loaded):
+            machine = delivery.get_machine()
+            assert machine.get_total_price() == 2850.0 + 55.5
+            assert f"Old game {2 * number + 1}" in str(delivery)
+            assert delivery.get_client().get_id() == 7
+    print(f"{'files':>8} {'import s':>9} {'by_client s':>12}")
+    print(f"{size:>8} {imported:>9.3f} {read:>12.3f}")
+
+
+# ========== Machine summary ========== #
+def bench_render(sizes=(1_000, 10_000), repeats=20):
+    """This function compares rendering machine summaries with and without caches.
+
+    The baseline concatenates the summary with += and renders every
+    VideoGame again each time, as the machines did before.
+    """
+    factory = PredefinedMachines()
+    print(f"{'titles':>8} {'+= uncached (s)':>16} {'first str (s)':>14} {'cached str (s)':>15} {'write_to (s)':>13}")
+    for size in sizes:
+        machine = factory.create_machine("vr", "red", "wood")
+        videogames = [vg for vg in make_videogames(size * len(CATEGORIES)) if vg.get_category() == "vr"]
+        for vg in videogames:
+            machine.add_videogame(vg)
+
+        def concatenated():
+            for _ in range(repeats):
+                temp_videogames = ""
+                for vg in videogames:
+                    temp_videogames += vg.to_text() + "\n"
+
+        first = timed(str, machine)
+        cached = timed(lambda: [str(machine) for _ in range(repeats)])
+        machine.remove_videogame(videogames[0].get_code())  # invalidates the summary
+        streamed = timed(lambda: [machine.write_to(io.StringIO()) for _ in range(repeats)])
+        print(f"{size:>8} {timed(concatenated):>16.3f} {first:>14.4f} {cached:>15.5f} {streamed:>13.4f}")
+
+
+# ========== Catalog persistence ========== #
+def add_one_by_one(states: list) -> Catalog:
+    """This function builds a catalog adding the videogames of the given states one by one."""
+    catalog = Catalog()
+    for state in states:
+        catalog.add(VideoGame(*state))
+    return catalog
+
+
+def bench_catalog_store(sizes=(100_000, 1_000_000), log_size=1_000):
+    """This function reports the startup time of a catalog saved by CatalogStore.
+
+    The store holds a snapshot and a log of log_size additions. The
+    baseline adds the same videogames one by one, which is what
+    replaying a store made only of a change log would cost. The price
+    and year indexes are sorted by the first query, which stats over
+    every category is, and its time is reported apart.
+    """
+    print(f"{'games':>10} {'add one by one s':>17} {'snapshot + log s':>17} {'first query s':>14}")
+    for size in sizes:
+        videogames = make_videogames(size)
+        states = [videogame.__getstate__() for videogame in videogames]
+        with tempfile.TemporaryDirectory() as folder:
+            store = CatalogStore(folder, compact_every=size + 1)
+            catalog = store.load()
+            catalog.extend(videogames[:size - log_size])
+            store.compact()
+            for videogame in videogames[size - log_size:]:
+                catalog.add(videogame)
+            store.close()
+            del catalog, store, videogames
+
+            one_by_one = timed(add_one_by_one, states)
+            store = CatalogStore(folder)
+            start = perf_counter()
+            catalog = store.load()
+            loaded = perf_counter() - start
+            assert len(catalog) == size
+            first_query = timed(catalog.stats)
+            store.close()
+        print(f"{size:>10} {one_by_one:>17.3f} {loaded:>17.3f} {first_query:>14.3f}")
+
+
+# ========== Text search ========== #
+SYLLABLES = ["ka", "ri", "to", "zen", "mor", "lu", "ve", "dra", "gon", "pix", "tur", "bo", "ne", "on", "sha", "dow"]
+WORDS = sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+
+
+def make_titled_videogames(size: int) -> list:
+    """This function builds synthetic videogames with names and descriptions made of WORDS.
+
+    The words are drawn with a skewed distribution, as in real titles,
+    so a few words are common and most are rare.
+    """
+    rng = random.Random(size)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    words = rng.choices(WORDS, weights, k=size * 8)
+    return [
+        VideoGame(code, " ".join(words[code * 8:code * 8 + 2]), " ".join(words[code * 8 + 2:code * 8 + 8]),
+                  f"Studio {code % 300}", f"Artist {code % 500}", CATEGORIES[code % len(CATEGORIES)],
+                  round(rng.uniform(5, 80), 2), 1980 + code % 45)
+        for code in range(size)
+    ]
+
+
+def scan_search(videogames: list, query: str, k: int) -> list:
+    """This function ranks videogames by the query words found in their text, visiting every one."""
+    terms = tokenize(query)
+    scored = []
+    for videogame in videogames:
+        text = " ".join((videogame.get_name(), videogame.get_storytelling_creator(),
+                         videogame.get_graphics_creator(), videogame.get_description())).lower()
+        score = sum(term in text for term in terms)
+        if score:
+            scored.append((-score, videogame.get_code()))
+    scored.sort()
+    return scored[:k]
+
+
+def bench_search(sizes=(10_000, 100_000), queries=20):
+    """This function compares scanning the catalog for a text with the SearchIndex."""
+    print(f"{'games':>10} {'build s':>8} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+    for size in sizes:
+        videogames = make_titled_videogames(size)
+        catalog = Catalog()
+        catalog.extend(videogames)
+        start = perf_counter()
+        index = SearchIndex(catalog)
+        build = perf_counter() - start
+        rng = random.Random(0)
+        texts = [f"{rng.choice(WORDS)} {rng.choice(WORDS)[:4]}" for _ in range(queries)]
+        scan = timed(lambda: [scan_search(videogames, text, 10) for text in texts]) / queries
+        indexed = timed(lambda: [index.search(text, 10) for text in texts]) / queries
+        print(f"{size:>10} {build:>8.2f} {scan * 1000:>9.2f} {indexed * 1000:>9.2f} {scan / indexed:>7.0f}x")
+
+
+# ========== Registered machines query ========== #
+def filter_chain(machines: list, query: dict) -> list:
+    """This function applies one list comprehension per filter, as the menu did before the query engine."""
+    rows = [m for m in machines if m["category"].lower() == query["category"]]
+    rows = [m for m in rows if m["material"].lower() in query["materials"]]
+    rows = [m for m in rows if query["low"] <= m["price"] <= query["high"]]
+    rows = [m for m in rows if query["color"] in m["color"].lower()]
+    return sorted(rows, key=lambda m: m["price"], reverse=True)[:query["limit"]]
+
+
+def bench_query(sizes=(100_000, 1_000_000), repeats=20):
+    """This function compares chained list comprehensions with a compiled machine query."""
+    rng = random.Random(0)
+    text = "category=dance material in (wood,aluminium) price 1000..1500 color~red order by price desc limit 20"
+    query = {"category": "dance", "materials": ("wood", "aluminium"), "low": 1000, "high": 1500,
+             "color": "red", "limit": 20}
+    print(f"{'sales':>10} {'list filters ms':>16} {'query ms':>9} {'speedup':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "registered_machines.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                for _ in range(size):
+                    file.write(format_machine_line(rng.choice(CATEGORIES), rng.choice(MATERIALS),
+                                                   rng.choice(["red", "dark red", "blue", "black"]),
+                                                   rng.uniform(500, 9000)))
+            ledger = MachineLedger(path)
+            ledger.refresh()
+            machines = ledger.get_machines()
+            assert filter_chain(machines, query) == search_machines(ledger, text)
+            slow = timed(lambda: [filter_chain(machines, query) for _ in range(repeats)]) / repeats
+            fast = timed(lambda: [search_machines(ledger, text) for _ in range(repeats)]) / repeats
+        print(f"{size:>10} {slow * 1000:>16.2f} {fast * 1000:>9.2f} {slow / fast:>7.0f}x")
+
+
+# ========== Catalog top-k ========== #
+def sort_queries(videogames: list, k: int) -> tuple:
+    """This function answers the top-k and aggregate queries by sorting the games of each category."""
+    results = []
+    for category in CATEGORIES:
+        games = [vg for vg in videogames if vg.get_category() == category]
+        results.append(sorted(games, key=lambda vg: (vg.get_price(), vg.get_code()))[:k])
+        results.append(sorted(games, key=lambda vg: (vg.get_year(), vg.get_code()), reverse=True)[:k])
+        prices = [vg.get_price() for vg in games]
+        results.append((len(prices), min(prices), max(prices), sum(prices) / len(prices)))
+    return results
+
+
+def index_queries(catalog: Catalog, k: int) -> tuple:
+    """This function answers the same queries as sort_queries with the catalog indexes."""
+    results = []
+    for category in CATEGORIES:
+        results.append(catalog.cheapest(category, k))
+        results.append(catalog.newest(category, k))
+        stats = catalog.stats(category)
+        results.append((stats["count"], stats["min_price"], stats["max_price"], stats["avg_price"]))
+    return results
+
+
+def bench_topk(sizes=(10_000, 100_000, 1_000_000), k=10):
+    """This function compares sorting the catalog with its top-k and aggregate queries."""
+    print(f"{'games':>10} {'sort ms':>10} {'Catalog ms':>11} {'speedup':>9}")
+    for size in sizes:
+        videogames = make_videogames(size)
+        catalog = Catalog()
+        catalog.extend(videogames)
+        slow = timed(sort_queries, videogames, k)
+        fast = timed(index_queries, catalog, k)
+        assert [len(result) for result in sort_queries(videogames, k)] == \
+            [len(result) for result in index_queries(catalog, k)]
+        print(f"{size:>10} {slow * 1000:>10.2f} {fast * 1000:>11.3f} {slow / fast:>8.0f}x")
+
+
+# ========== Shared game variants ========== #
+def bench_variants(sizes=(1_000, 5_000), titles=20):
+    """This function compares the memory of machines holding copies of their videogames and shared variants.
+
+    The baseline gives every machine its own copy of each videogame, the
+    way to choose high definition per machine without changing the
+    catalog when highDefinition changed the price of the videogame.
+    """
+    factory = PredefinedMachines()
+    videogames = [vg for vg in make_videogames(titles * len(CATEGORIES)) if vg.get_category() == "vr"]
+    print(f"{'machines':>10} {'copies (MB)':>12} {'variants (MB)':>14} {'saved':>7}")
+    for size in sizes:
+        used = []
+        for shared in (False, True):
+            tracemalloc.start()
+            machines = []
+            for number in range(size):
+                machine = factory.create_machine("vr", "red", "wood")
+                for position, vg in enumerate(videogames):
+                    high = (number + position) % 2 == 0
+                    if shared:
+                        machine.add_videogame(vg.variant(high))
+                    else:
+                        game = VideoGame(*vg.__getstate__())
+                        game.highDefinition(high)
+                        machine.add_videogame(game)
+                machines.append(machine)
+            used.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del machines
+        copies, variants = used
+        print(f"{size:>10} {copies / 2**20:>12.1f} {variants / 2**20:>14.1f} {1 - variants / copies:>6.0%}")
+
+
+# ========== Quote cache ========== #
+def check_quotes(engine: OrderEngine, catalog: Catalog):
+    """This function checks that the quote of every category and material is the price of the real machine.
+
+    The expected price is computed by hand from MACHINE_SPECS: the base
+    price plus the controls or glasses, adjusted by material, plus the
+    price of the games, in high definition where it was chosen.
+    """
+    accessories = {"dance": MACHINE_SPECS["dance"][7][2], "vr": MACHINE_SPECS["vr"][7][2]}
+    for category in CATEGORIES:
+        games = [vg for vg in catalog.by_category(category)][:3]
+        flags = [True, False, True][:len(games)]
+        games_price = sum(vg.get_high_definition_price() if high else vg.get_price()
+                          for vg, high in zip(games, flags))
+        for material in MATERIALS:
+            spec = OrderSpec(category, material, "Red", [vg.get_code() for vg in games], flags)
+            price = MACHINE_SPECS[category][6] + accessories.get(category, 0)
+            expected = price + price * MATERIAL_ADJUSTMENTS[material][1] + games_price
+            machine, total_price = engine.build(spec)
+            assert abs(engine.quote(spec) - expected) < 1e-6, (category, material, engine.quote(spec), expected)
+            assert abs(total_price - expected) < 1e-6 and machine.get_total_price() == total_price
+
+
+def bench_quotes(configurations=(100, 1_000), quotes=20_000):
+    """This function compares building a machine for every quote with the quote cache.
+
+    The quotes are drawn from a fixed number of configurations, as sales
+    staff asking again for the same machines, and the cache holds them all.
+    """
+    catalog = Catalog()
+    catalog.extend(make_videogames(1_000))
+    print(f"{'configs':>10} {'build (us)':>11} {'cached (us)':>12} {'speedup':>8} {'hit rate':>9}")
+    for size in configurations:
+        specs = [OrderSpec(order["category"], order["material"], order["color"],
+                           order["games"], order["high_definition"])
+                 for order in make_orders(size, 1_000)]
+        rng = random.Random(size)
+        requests = [rng.choice(specs) for _ in range(quotes)]
+        engine = OrderEngine(catalog, None, os.devnull, quote_cache_size=size)
+        check_quotes(engine, catalog)
+        slow = timed(lambda: [engine.build(spec)[1] for spec in requests])
+        fast = timed(lambda: [engine.quote(spec) for spec in requests])
+        cache = engine.get_quote_cache()
+        assert all(abs(engine.quote(spec) - engine.build(spec)[1]) < 1e-6 for spec in specs)
+        hit_rate = cache.get_hits() / (cache.get_hits() + cache.get_misses())
+        print(f"{size:>10} {slow / quotes * 1e6:>11.1f} {fast / quotes * 1e6:>12.2f} "
+              f"{slow / fast:>7.0f}x {hit_rate:>9.1%}")
+
+
+# ========== Sales server ========== #
+async def run_terminals(server: SalesServer, terminals: int, requests: int) -> tuple:
+    """This function connects many terminals that quote and then buy a machine.
+
+    Returns:
+        A tuple with the seconds spent on the quotes and on the purchases.
+    """
+    listener = await server.start(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    login = {"action": "login", "client": {"id": 1, "name": "Batch", "email": "batch@example.com",
+                                           "phone": "3001234567", "address": {"street": "Street 1",
+                                                                              "zip_code": 110111,
+                                                                              "city": "Bogota",
+                                                                              "country": "Colombia"}}}
+    connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(terminals)]
+
+    async def ask(connection, request: dict) -> dict:
+        reader, writer = connection
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        assert response["ok"], response
+        return response
+
+    async def quote(number: int, connection):
+        await ask(connection, login)
+        category = number % len(CATEGORIES)
+        await ask(connection, {"action": "start", "category": CATEGORIES[category],
+                               "material": "wood", "color": "red"})
+        for request in range(requests):
+            await ask(connection, {"action": "add", "code": category + len(CATEGORIES) * request,
+                                   "high_definition": request % 2 == 0})
+            await ask(connection, {"action": "quote"})
+
+    async def buy(connection):
+        await ask(connection, {"action": "buy", "address": 1})
+
+    start = perf_counter()
+    await asyncio.gather(*(quote(number, connection) for number, connection in enumerate(connections)))
+    quoted = perf_counter() - start
+    start = perf_counter()
+    await asyncio.gather(*(buy(connection) for connection in connections))
+    bought = perf_counter() - start
+    for _, writer in connections:
+        writer.close()
+    listener.close()
+    await listener.wait_closed()
+    await server.stop()
+    return quoted, bought
+
+
+def bench_server(sizes=(100, 300), requests=10):
+    """This function reports the requests per second of SalesServer with many terminals at once.
+
+    Every terminal adds games and asks for a quote after each one, and
+    then all of them buy their machine at the same time.
+    """
+    catalog = Catalog()
+    catalog.extend(make_videogames(1_000))
+    print(f"{'terminals':>10} {'requests/s':>11} {'purchases/s':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            deliveries = DeliveryStore(os.path.join(folder, "deliveries"))
+            server = SalesServer(catalog, os.path.join(folder, "registered_machines.txt"), deliveries)
+            quoted, bought = asyncio.run(run_terminals(server, size, requests))
+            assert len(deliveries) == size
+        print(f"{size:>10} {size * (2 + 2 * requests) / quoted:>11.0f} {size / bought:>12.0f}")
+
+
+# ========== Concurrent catalog ========== #
+def stress_catalog(catalog, readers: int = 8, writers: int = 4, operations: int = 2_000) -> list:
+    """This function changes and reads a catalog from many threads at once.
+
+    Every writer adds and removes its own range of codes while the
+    readers walk the catalog as Main.show_videogames does and check that
+    the count of every category agrees with its games.
+
+    Returns:
+        A list with the errors seen by the threads.
+    """
+    errors = []
+    done = threading.Event()
+    reading = catalog.read if isinstance(catalog, ConcurrentCatalog) else nullcontext
+
+    def write(number: int):
+        base = 1_000_000 * (number + 1)
+        try:
+            for code in range(base, base + operations):
+                catalog.add(VideoGame(code, f"Game {code}", "Stress game", "Studio", "Studio",
+                                      CATEGORIES[code % len(CATEGORIES)], float(code % 97), 2000))
+                if code % 2:
+                    catalog.remove(code)
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(repr(e))
+
+    def read():
+        try:
+            while not done.is_set():
+                for _ in catalog:
+                    pass
+                for category in CATEGORIES:
+                    with reading():
+                        count = len(catalog.by_category(category))
+                        stats = catalog.stats(category)
+                    if stats["count"] != count:
+                        errors.append(f"{category}: stats count {stats['count']} != {count} games")
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(writers)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[:writers]:
+        thread.join()
+    done.set()
+    for thread in threads[writers:]:
+        thread.join()
+    return errors
+
+
+def bench_catalog_stress(size=10_000, readers=8, writers=4, operations=2_000):
+    """This function runs stress_catalog on a Catalog and on a ConcurrentCatalog.
+
+    The plain Catalog is expected to fail, a reader sees a dictionary
+    change while it walks it, the ConcurrentCatalog must see no error
+    and end with the videogames the writers left.
+    """
+    sys.setswitchinterval(1e-5)  # switch threads often, to make races likely
+    try:
+        print(f"{'catalog':>18} {'errors':>7} {'games':>7} {'expected':>9}")
+        for catalog in (Catalog(), ConcurrentCatalog()):
+            catalog.extend(make_videogames(size))
+            errors = stress_catalog(catalog, readers, writers, operations)
+            expected = size + writers * operations // 2
+            print(f"{type(catalog).__name__:>18} {len(errors):>7} {len(catalog):>7} {expected:>9}")
+            if isinstance(catalog, ConcurrentCatalog):
+                assert not errors, errors[:5]
+                assert len(catalog) == expected, f"{len(catalog)} games, expected {expected}"
+    finally:
+        sys.setswitchinterval(0.005)
+
+
+def bench_catalog_threads(size=100_000, threads=(1, 4, 16), reads=200_000):
+    """This function reports the reads per second of a ConcurrentCatalog at several thread counts.
+
+    Every read is a lookup by code plus a top-k query, the same total
+    number of reads is split among the threads. The plain Catalog, with
+    a single thread and no lock, is the baseline.
+    """
+    videogames = make_videogames(size)
+    plain = Catalog()
+    plain.extend(videogames)
+    shared = ConcurrentCatalog()
+    shared.extend(videogames)
+
+    def read(catalog, count: int):
+        for code in range(count):
+            catalog.get(code % size)
+            catalog.cheapest(CATEGORIES[code % len(CATEGORIES)], 5)
+
+    print(f"{'threads':>8} {'reads/s':>10} {'vs Catalog':>11}")
+    baseline = reads / timed(read, plain, reads)
+    print(f"{'Catalog':>8} {baseline:>10.0f} {1:>10.2f}x")
+    for count in threads:
+        workers = [threading.Thread(target=read, args=(shared, reads // count)) for _ in range(count)]
+
+        def run():
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        rate = reads / timed(run)
+        print(f"{count:>8} {rate:>10.0f} {rate / baseline:>10.2f}x")
+
+
+# ========== Bulk quotes ========== #
+def bench_bulk_quotes(size=100_000, workers=(1, 2, 4, 8), chunk_size=1_000):
+    """This function reports the quotes per second of quote_file with several worker processes.
+
+    The baseline quotes the file in this process with OrderEngine.build,
+    the way a batch was priced before. Every run must give the same
+    quotes, in file order.
+    """
+    catalog = Catalog()
+    catalog.extend(make_videogames(1_000))
+    print(f"{os.cpu_count()} cores")
+    print(f"{'workers':>10} {'seconds':>9} {'quotes/s':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        orders_path = os.path.join(folder, "orders.jsonl")
+        with open(orders_path, "w", encoding="utf-8") as file:
+            for order in make_orders(size, 1_000):
+                file.write(json.dumps(order) + "\n")
+
+        engine = OrderEngine(catalog, None, os.devnull)
+        start = perf_counter()
+        with open(orders_path, "r", encoding="utf-8") as file:
+            expected = [engine.build(OrderSpec.from_dict(json.loads(line)))[1] for line in file]
+        baseline = perf_counter() - start
+        print(f"{'build':>10} {baseline:>9.2f} {size / baseline:>10.0f} {1:>7.2f}x")
+        for count in workers:
+            report = quote_file(catalog, orders_path, count, chunk_size)
+            prices = [price for _, price in report["quotes"]]
+            assert prices == expected, "the quotes differ from OrderEngine.build"
+            print(f"{count:>10} {report['seconds']:>9.2f} {report['quotes_per_second']:>10.0f} "
+                  f"{baseline / report['seconds']:>7.2f}x")
+
+
+BENCHMARKS = {
+    "catalog": bench_catalog,
+    "memory": bench_memory,
+    "ledger": bench_ledger,
+    "orders": bench_orders,
+    "factory": bench_factory,
+    "fleet": bench_fleet,
+    "machine": bench_machine,
+    "deliveries": bench_deliveries,
+    "render": bench_render,
+    "catalog_store": bench_catalog_store,
+    "search": bench_search,
+    "query": bench_query,
+    "topk": bench_topk,
+    "variants": bench_variants,
+    "quotes": bench_quotes,
+    "server": bench_server,
+    "catalog_stress": bench_catalog_stress,
+    "catalog_threads": bench_catalog_threads,
+    "bulk_quotes": bench_bulk_quotes,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"\n# {name}")
+        BENCHMARKS[name]()
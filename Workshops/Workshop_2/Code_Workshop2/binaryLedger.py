@@ -0,0 +1,203 @@
+"""
+This module has a class to store the registered machines in a binary ledger.
+
+Every sale is a fixed-width record, so the n-th sale is found with one
+seek and large files are scanned through a memory map without parsing
+text. The layout of a record is:
+
+    category id (uint8), material id (uint8), padding (uint16),
+    color id (uint32), price in cents (int64), unix timestamp (int64)
+
+Colors are interned: the ledger keeps them in a sidecar file with the
+".colors" suffix, one per line, where the line number is the color id.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import mmap
+import struct
+from datetime import datetime
+from ledger import parse_machine_line
+from factoryMachines import CATEGORIES, MATERIALS
+
+MAGIC = b"MLEDGER1"
+RECORD = struct.Struct("<BBHIqq")
+
+
+class BinaryMachineLedger:
+    """This class represents a ledger of registered machines made of fixed-width records."""
+
+    def __init__(self, path: str = "registered_machines.bin"):
+        self.__path = path
+        self.__colors_path = path + ".colors"
+        self.__colors = []
+        self.__color_ids = {}
+
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(MAGIC)
+        else:
+            with open(path, "rb") as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a binary machine ledger")
+
+        if os.path.exists(self.__colors_path):
+            with open(self.__colors_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    self.__intern_loaded(line.rstrip("\n"))
+
+    def __intern_loaded(self, color: str):
+        self.__color_ids[color] = len(self.__colors)
+        self.__colors.append(color)
+
+    def __color_id(self, color: str) -> int:
+        color = color.strip().lower()
+        color_id = self.__color_ids.get(color)
+        if color_id is None:
+            with open(self.__colors_path, "a", encoding="utf-8") as file:
+                file.write(color + "\n")
+            self.__intern_loaded(color)
+            color_id = self.__color_ids[color]
+        return color_id
+
+    def __pack(self, category: str, material: str, color: str, price: float, timestamp: int = None) -> bytes:
+        try:
+            category_id = CATEGORIES.index(category.strip().lower())
+            material_id = MATERIALS.index(material.strip().lower())
+        except ValueError:
+            raise ValueError(f"Unknown category or material: {category}, {material}") from None
+        if timestamp is None:
+            timestamp = int(datetime.now().timestamp())
+        return RECORD.pack(category_id, material_id, 0, self.__color_id(color),
+                           round(price * 100), timestamp)
+
+    def __unpack(self, record: tuple) -> dict:
+        category_id, material_id, _, color_id, cents, timestamp = record
+        return {
+            "category": CATEGORIES[category_id],
+            "material": MATERIALS[material_id],
+            "color": self.__colors[color_id],
+            "price": cents / 100,
+            "timestamp": timestamp,
+        }
+
+    def append(self, category: str, material: str, color: str, price: float, timestamp: int = None):
+        """This method records the sale of a machine.
+
+        Args:
+            category (str): Category of the machine, e.g. "dance".
+            material (str): Material of the machine, e.g. "wood".
+            color (str): Color of the machine.
+            price (float): Total price paid for the machine.
+            timestamp (int): Unix time of the sale, defaults to now.
+
+        Raises:
+            ValueError: If the category or the material is unknown.
+        """
+        self.append_many([(category, material, color, price, timestamp)])
+
+    def append_many(self, sales):
+        """This method records many sales with a single write.
+
+        Args:
+            sales: Iterable of (category, material, color, price, timestamp) tuples.
+        """
+        data = b"".join(self.__pack(*sale) for sale in sales)
+        with open(self.__path, "ab") as file:
+            file.write(data)
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.__path) - len(MAGIC)) // RECORD.size
+
+    def __getitem__(self, index: int) -> dict:
+        """Returns the index-th sale, read with a single seek."""
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("ledger index out of range")
+        with open(self.__path, "rb") as file:
+            file.seek(len(MAGIC) + index * RECORD.size)
+            return self.__unpack(RECORD.unpack(file.read(RECORD.size)))
+
+    def scan(self, min_price: float = None, max_price: float = None,
+             category: str = None, material: str = None):
+        """This method yields the sales that match every given criterion.
+
+        The file is memory-mapped and the records are compared as raw
+        integers, only the matches are decoded.
+
+        Args:
+            min_price (float): Lowest price included, or None.
+            max_price (float): Highest price included, or None.
+            category (str): Category of the machine, or None.
+            material (str): Material of the machine, or None.
+
+        Yields:
+            Dictionaries with category, material, color, price and timestamp.
+        """
+        low = round(min_price * 100) if min_price is not None else -2**63
+        high = round(max_price * 100) if max_price is not None else 2**63 - 1
+        category_id = CATEGORIES.index(category.strip().lower()) if category else None
+        material_id = MATERIALS.index(material.strip().lower()) if material else None
+
+        end = len(MAGIC) + len(self) * RECORD.size
+        if end == len(MAGIC):
+            return
+        with open(self.__path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)[len(MAGIC):end]
+            try:
+                for record in RECORD.iter_unpack(view):
+                    if not low <= record[4] <= high:
+                        continue
+                    if category_id is not None and record[0] != category_id:
+                        continue
+                    if material_id is not None and record[1] != material_id:
+                        continue
+                    yield self.__unpack(record)
+            finally:
+                view.release()
+
+
+def convert_text_ledger(text_path: str = "registered_machines.txt",
+                        binary_path: str = "registered_machines.bin") -> int:
+    """This function copies a text ledger of registered machines into a binary ledger.
+
+    The text format has no dates, so every converted sale is stamped with
+    the modification time of the text file.
+
+    Args:
+        text_path (str): Path of the text ledger.
+        binary_path (str): Path of the binary ledger, created if needed.
+
+    Returns:
+        The number of sales converted.
+    """
+    timestamp = int(os.path.getmtime(text_path))
+    ledger = BinaryMachineLedger(binary_path)
+    sales = []
+    with open(text_path, "r", encoding="utf-8") as file:
+        for line in file:
+            machine = parse_machine_line(line)
+            if machine is not None:
+                sales.append((machine["category"], machine["material"], machine["color"],
+                              machine["price"], timestamp))
+    ledger.append_many(sales)
+    return len(sales)
@@ -0,0 +1,180 @@
+"""
+This module has functions to quote large files of orders on every core.
+
+The orders are read from a JSONL file, as the batches of the orders
+module, split into chunks of lines and quoted by a pool of worker
+processes. Every worker receives the catalog once, when it starts, and
+keeps its own OrderEngine. The orders of a batch are mostly different
+machines, so they are priced with OrderEngine.build, which gives the
+same price that placing them would, rather than through the quote cache.
+
+Run it from this folder to quote a file against the saved catalog:
+
+    python bulkQuotes.py orders.jsonl [--workers N] [--chunk-size N]
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import perf_counter
+from videogames import VideoGame
+from catalog import Catalog
+from catalogStore import CatalogStore
+from orders import OrderEngine, OrderSpec
+
+_engine = None  # OrderEngine of a worker process
+
+
+def catalog_columns(catalog: Catalog) -> dict:
+    """This function returns the videogames of a catalog in the snapshot layout of CatalogStore.
+
+    Args:
+        catalog (Catalog): Catalog to copy.
+
+    Returns:
+        A dictionary with, for every category, one list per videogame field.
+    """
+    categories = {}
+    for category in catalog.categories():
+        states = [videogame.__getstate__() for videogame in catalog.by_category(category)]
+        categories[category] = [list(column) for column in zip(*states)]
+    return categories
+
+
+def _start_worker(categories: dict):
+    """Builds the catalog and the OrderEngine of a worker process."""
+    global _engine  # pylint: disable=global-statement
+    catalog = Catalog()
+    for category, columns in categories.items():
+        catalog.extend(map(VideoGame, *columns), category)
+    _engine = OrderEngine(catalog, None, os.devnull)
+
+
+def quote_lines(numbered_lines: list) -> list:
+    """This function quotes a chunk of order lines with the OrderEngine of the process.
+
+    Args:
+        numbered_lines (list): (line_number, line) tuples.
+
+    Returns:
+        A list of (line_number, total_price, error) tuples, the price is
+        None when the order is not valid and the error None when it is.
+    """
+    results = []
+    for number, line in numbered_lines:
+        try:
+            results.append((number, _engine.build(OrderSpec.from_dict(json.loads(line)))[1], None))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            results.append((number, None, str(e)))
+    return results
+
+
+def _numbered_lines(path: str):
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                yield number, line
+
+
+def quote_file(catalog: Catalog, path: str, workers: int = None, chunk_size: int = 1_000) -> dict:
+    """This function quotes every order of a JSONL file.
+
+    The lines are sent to the workers in chunks, and only a few chunks
+    per worker are pending at a time, so the file is never held in
+    memory. The results are collected in the order the chunks were sent,
+    which is the order of the file.
+
+    Args:
+        catalog (Catalog): Catalog the orders are priced with.
+        path (str): Path of the file, one JSON order per line.
+        workers (int): Number of worker processes, one per core if not
+            given, or 1 to quote in this process.
+        chunk_size (int): Number of lines sent to a worker at a time.
+
+    Returns:
+        A dictionary with the quotes as (line_number, total_price) tuples
+        in file order, the failures as (line_number, message) tuples, the
+        elapsed seconds and the quotes per second.
+    """
+    start = perf_counter()
+    workers = workers or os.cpu_count() or 1
+    lines = _numbered_lines(path)
+    chunks = iter(lambda: list(islice(lines, chunk_size)), [])
+    quotes = []
+    failures = []
+
+    def collect(results: list):
+        for number, price, error in results:
+            if error is None:
+                quotes.append((number, price))
+            else:
+                failures.append((number, error))
+
+    if workers == 1:
+        _start_worker(catalog_columns(catalog))
+        for chunk in chunks:
+            collect(quote_lines(chunk))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_start_worker,
+                                 initargs=(catalog_columns(catalog),)) as pool:
+            pending = deque(pool.submit(quote_lines, chunk) for chunk in islice(chunks, 2 * workers))
+            while pending:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(pool.submit(quote_lines, chunk))
+                collect(results)
+
+    seconds = perf_counter() - start
+    return {
+        "quoted": len(quotes),
+        "failed": len(failures),
+        "quotes": quotes,
+        "failures": failures,
+        "seconds": seconds,
+        "quotes_per_second": len(quotes) / seconds if seconds else float("inf"),
+    }
+
+
+def main():
+    """This function quotes a file of orders against the saved catalog and prints a JSON line per order."""
+    parser = argparse.ArgumentParser(description="Quote every order of a JSONL file.")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    arguments = parser.parse_args()
+
+    catalog_store = CatalogStore("catalog")
+    catalog = catalog_store.load()
+    catalog_store.close()
+    report = quote_file(catalog, arguments.path, arguments.workers, arguments.chunk_size)
+    results = [(number, {"line": number, "total_price": price}) for number, price in report["quotes"]]
+    results += [(number, {"line": number, "error": message}) for number, message in report["failures"]]
+    for _, result in sorted(results, key=lambda item: item[0]):
+        sys.stdout.write(json.dumps(result) + "\n")
+    print(f"{report['quoted']} orders quoted, {report['failed']} failed, "
+          f"{report['quotes_per_second']:.0f} quotes/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
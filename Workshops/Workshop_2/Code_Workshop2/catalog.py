@@ -0,0 +1,372 @@
+"""
+This module has a class to define the videogames catalog of the application.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from operator import itemgetter
+from videogames import VideoGame
+
+
+def normalize_category(category: str) -> str:
+    """This function returns the canonical form of a category name.
+
+    Args:
+        category (str): Category as typed by a user or stored in a videogame.
+
+    Returns:
+        The category without surrounding spaces and in lower case.
+    """
+    return category.strip().lower()
+
+
+class Catalog:
+    """This class represents the catalog of videogames offered by the application.
+
+    The videogames are kept in a dictionary keyed by code, so lookup,
+    insertion and deletion by code are O(1) while the iteration order
+    remains the order in which the videogames were added.
+
+    Secondary indexes are maintained on every change: the games of each
+    normalized category, and per category the lists of (price, code) and
+    (year, code) pairs sorted when read, plus the sum of the prices. Top-k
+    queries read k pairs from an end of a sorted list, and the count,
+    minimum, maximum and average of a category need no scan. The catalog
+    watches its videogames, so a price changed through
+    VideoGame.highDefinition is re-indexed too.
+
+    Journals are told about every change, with the methods
+    added(videogame), removed(videogame) and changed(videogame), which
+    is how CatalogStore keeps the catalog on disk and SearchIndex keeps
+    its index up to date.
+    """
+
+    def __init__(self):
+        self.__videogames = {}
+        self.__categories = {}
+        self.__prices = {}
+        self.__years = {}
+        self.__price_sums = {}
+        self.__unsorted = set()  # categories whose indexes extend left unsorted
+        self.__journals = []
+
+    def add_journal(self, journal):
+        """This method registers an object to be told about the changes of the catalog.
+
+        Args:
+            journal: Object with added, removed and changed methods.
+        """
+        self.__journals.append(journal)
+
+    def remove_journal(self, journal):
+        """This method stops telling an object about the changes of the catalog.
+
+        Args:
+            journal: Object previously registered with add_journal.
+        """
+        self.__journals.remove(journal)
+
+    def add(self, videogame: VideoGame) -> bool:
+        """This method adds a videogame to the catalog.
+
+        Args:
+            videogame (VideoGame): videogame to be added.
+
+        Returns:
+            True if the videogame was added, False if its code already exists.
+        """
+        code = videogame.get_code()
+        if code in self.__videogames:
+            return False
+        self.__videogames[code] = videogame
+        category = normalize_category(videogame.get_category())
+        self.__categories.setdefault(category, {})[code] = videogame
+        if category in self.__unsorted:
+            self.__prices[category].append((videogame.get_price(), code))
+            self.__years[category].append((videogame.get_year(), code))
+        else:
+            insort(self.__prices.setdefault(category, []), (videogame.get_price(), code))
+            insort(self.__years.setdefault(category, []), (videogame.get_year(), code))
+        self.__price_sums[category] = self.__price_sums.get(category, 0.0) + videogame.get_price()
+        videogame.add_watcher(self)
+        for journal in self.__journals:
+            journal.added(videogame)
+        return True
+
+    def extend(self, videogames, category: str = None) -> int:
+        """This method adds many videogames at once.
+
+        Instead of inserting every price in its index, the new pairs are
+        appended and the indexes of the category are sorted once, by the
+        first query that needs them, so loading a large catalog does not
+        wait for sorts that a query may never ask for. When the category
+        of all the videogames is given they are grouped without visiting
+        them one by one, only their distinct categories are checked.
+
+        Args:
+            videogames: Iterable of VideoGame.
+            category (str): Category shared by all the videogames, if known.
+
+        Returns:
+            The number of videogames added, the codes that already exist are skipped.
+
+        Raises:
+            ValueError: If a videogame is not of the given category, nothing is added then.
+        """
+        videogames = list(videogames)
+        if category is not None:
+            category = normalize_category(category)
+            for own in set(map(VideoGame.get_category, videogames)):
+                if normalize_category(own) != category:
+                    raise ValueError(f"A videogame of category {own} can't be added as {category}")
+            groups = {category: videogames}
+        else:
+            groups = {}
+            for videogame in videogames:
+                groups.setdefault(normalize_category(videogame.get_category()), []).append(videogame)
+
+        added = 0
+        for category, group in groups.items():
+            codes = list(map(VideoGame.get_code, group))
+            new = dict(zip(codes, group))
+            if len(new) != len(group) or not self.__videogames.keys().isdisjoint(new):
+                added += sum(self.add(videogame) for videogame in group)
+                continue
+            self.__videogames.update(new)
+            self.__categories.setdefault(category, {}).update(new)
+            group_prices = list(map(VideoGame.get_price, group))
+            self.__price_sums[category] = self.__price_sums.get(category, 0.0) + sum(group_prices)
+            self.__prices.setdefault(category, []).extend(zip(group_prices, codes))
+            self.__years.setdefault(category, []).extend(zip(map(VideoGame.get_year, group), codes))
+            self.__unsorted.add(category)
+            VideoGame.add_watcher_to_all(group, self)
+            for journal in self.__journals:
+                for videogame in group:
+                    journal.added(videogame)
+            added += len(group)
+        return added
+
+    def remove(self, code: int):
+        """This method removes a videogame from the catalog.
+
+        Args:
+            code (int): Code of the videogame to be removed.
+
+        Returns:
+            The removed VideoGame, or None if the code is not in the catalog.
+        """
+        videogame = self.__videogames.pop(code, None)
+        if videogame is not None:
+            category = normalize_category(videogame.get_category())
+            self.__sort_indexes(category)
+            del self.__categories[category][code]
+            self.__unindex_price(category, videogame.get_price(), code)
+            self.__price_sums[category] -= videogame.get_price()
+            years = self.__years[category]
+            years.pop(bisect_left(years, (videogame.get_year(), code)))
+            videogame.remove_watcher(self)
+            for journal in self.__journals:
+                journal.removed(videogame)
+        return videogame
+
+    def get(self, code: int):
+        """This method returns the videogame with the given code.
+
+        Args:
+            code (int): Code of the videogame to be found.
+
+        Returns:
+            The VideoGame with that code, or None if it is not in the catalog.
+        """
+        return self.__videogames.get(code)
+
+    def by_category(self, category: str) -> list:
+        """This method returns the videogames of a category.
+
+        Args:
+            category (str): Category to look for, in any letter case.
+
+        Returns:
+            A list with the videogames of the category in insertion order.
+        """
+        return list(self.__categories.get(normalize_category(category), {}).values())
+
+    def categories(self) -> list:
+        """This method returns the categories that have videogames.
+
+        Returns:
+            A list with the normalized categories.
+        """
+        return [category for category, videogames in self.__categories.items() if videogames]
+
+    def by_price_range(self, category: str, min_price: float, max_price: float) -> list:
+        """This method returns the videogames of a category within a price range.
+
+        Args:
+            category (str): Category to look for, in any letter case.
+            min_price (float): Lowest price included in the range.
+            max_price (float): Highest price included in the range.
+
+        Returns:
+            A list with the matching videogames sorted by price.
+        """
+        category = normalize_category(category)
+        self.__sort_indexes(category)
+        prices = self.__prices.get(category, [])
+        start = bisect_left(prices, (min_price,))
+        end = bisect_right(prices, (max_price, float("inf")))
+        return [self.__videogames[code] for _, code in prices[start:end]]
+
+    def __ranked(self, index: dict, category: str, k: int, highest: bool) -> list:
+        """Returns the videogames of the first k pairs of a sorted index, from either end."""
+        if category is None:
+            self.__sort_indexes()
+            lists = list(index.values())
+        else:
+            category = normalize_category(category)
+            self.__sort_indexes(category)
+            lists = [index.get(category, [])]
+        if highest:
+            pairs = heapq.merge(*(reversed(pairs) for pairs in lists), reverse=True)
+        else:
+            pairs = heapq.merge(*lists)
+        return [self.__videogames[code] for _, code in islice(pairs, k)]
+
+    def cheapest(self, category: str = None, k: int = 10) -> list:
+        """This method returns the cheapest videogames.
+
+        Args:
+            category (str): Category to look in, in any letter case, or None for every category.
+            k (int): Maximum number of videogames to return.
+
+        Returns:
+            A list with up to k videogames, from the cheapest.
+        """
+        return self.__ranked(self.__prices, category, k, False)
+
+    def most_expensive(self, category: str = None, k: int = 10) -> list:
+        """This method returns the most expensive videogames.
+
+        The high definition surcharge is proportional to the price, so
+        these are also the most expensive videogames in high definition.
+
+        Args:
+            category (str): Category to look in, in any letter case, or None for every category.
+            k (int): Maximum number of videogames to return.
+
+        Returns:
+            A list with up to k videogames, from the most expensive.
+        """
+        return self.__ranked(self.__prices, category, k, True)
+
+    def newest(self, category: str = None, k: int = 10) -> list:
+        """This method returns the newest videogames by year.
+
+        Args:
+            category (str): Category to look in, in any letter case, or None for every category.
+            k (int): Maximum number of videogames to return.
+
+        Returns:
+            A list with up to k videogames, from the newest.
+        """
+        return self.__ranked(self.__years, category, k, True)
+
+    def stats(self, category: str = None) -> dict:
+        """This method returns the count, minimum, maximum and average price of the videogames.
+
+        Args:
+            category (str): Category to look in, in any letter case, or None for every category.
+
+        Returns:
+            A dictionary with count, min_price, max_price, avg_price,
+            oldest_year and newest_year. The prices and years are None
+            when there are no videogames.
+        """
+        if category is None:
+            self.__sort_indexes()
+            categories = [category for category, prices in self.__prices.items() if prices]
+        else:
+            category = normalize_category(category)
+            self.__sort_indexes(category)
+            categories = [category] if self.__prices.get(category) else []
+        count = sum(len(self.__prices[category]) for category in categories)
+        if not count:
+            return {"count": 0, "min_price": None, "max_price": None, "avg_price": None,
+                    "oldest_year": None, "newest_year": None}
+        return {
+            "count": count,
+            "min_price": min(self.__prices[category][0][0] for category in categories),
+            "max_price": max(self.__prices[category][-1][0] for category in categories),
+            "avg_price": sum(self.__price_sums[category] for category in categories) / count,
+            "oldest_year": min(self.__years[category][0][0] for category in categories),
+            "newest_year": max(self.__years[category][-1][0] for category in categories),
+        }
+
+    def price_changed(self, videogame: VideoGame, old_price: float):
+        """This method re-indexes a videogame whose price has changed.
+
+        Args:
+            videogame (VideoGame): Videogame whose price changed.
+            old_price (float): Price the videogame was indexed with.
+        """
+        for journal in self.__journals:
+            journal.changed(videogame)
+        if videogame.get_price() == old_price:
+            return
+        code = videogame.get_code()
+        category = normalize_category(videogame.get_category())
+        self.__sort_indexes(category)
+        self.__unindex_price(category, old_price, code)
+        insort(self.__prices[category], (videogame.get_price(), code))
+        self.__price_sums[category] += videogame.get_price() - old_price
+
+    def __sort_indexes(self, category: str = None):
+        """Sorts the indexes that extend left unsorted, of a category or of every category.
+
+        The sorted pairs replace the lists instead of sorting them in
+        place, so a query reading an index from another thread never
+        sees it half sorted.
+        """
+        if category is None:
+            categories = list(self.__unsorted)
+        else:
+            categories = [category] if category in self.__unsorted else []
+        for category in categories:
+            for index in (self.__prices, self.__years):
+                # Sorting by code and then, stably, by value gives the order
+                # of sorting the pairs, comparing numbers instead of tuples.
+                pairs = sorted(index[category], key=itemgetter(1))
+                pairs.sort(key=itemgetter(0))
+                index[category] = pairs
+            self.__unsorted.discard(category)
+
+    def __unindex_price(self, category: str, price: float, code: int):
+        prices = self.__prices[category]
+        prices.pop(bisect_left(prices, (price, code)))
+
+    def __contains__(self, code: int) -> bool:
+        return code in self.__videogames
+
+    def __len__(self) -> int:
+        return len(self.__videogames)
+
+    def __iter__(self):
+        return iter(self.__videogames.values())
@@ -0,0 +1,248 @@
+"""
+This module has a class to keep the videogames catalog on disk.
+
+The catalog is stored as a snapshot plus a log of the changes made
+after it. The snapshot holds, for every category, one list per
+videogame field, so loading it creates few objects besides the
+videogames themselves. Every add, removal or change of the catalog is
+appended to the log, which is replayed after the snapshot on start and
+folded into a new snapshot, in the background, once it grows long.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import gc
+import os
+import sys
+import pickle
+import threading
+from videogames import VideoGame
+from catalog import Catalog, normalize_category
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
+
+error_log = get_log("log.txt")
+
+SNAPSHOT_NAME = "catalog.snapshot"
+LOG_NAME = "catalog.log"
+OLD_LOG_NAME = "catalog.log.old"
+SNAPSHOT_VERSION = 1
+
+
+class CatalogStore:
+    """This class represents the catalog saved as a snapshot and a change log.
+
+    The log records are pickled tuples ("add", state), ("remove", code)
+    and ("change", state), where state is the tuple returned by
+    VideoGame.__getstate__. Replaying a record twice gives the same
+    catalog, so a crash between writing a snapshot and emptying the log
+    loses nothing. A record cut by a crash at the end of the log is
+    discarded. A loaded catalog lists its videogames grouped by
+    category, each group in the order the videogames were added.
+
+    Every compact_every records the log is renamed to an old log and a
+    new one is started, and a background thread merges the old log into
+    a new snapshot, reading only the files, so a change never waits for
+    the whole catalog to be written. On load the old log, if any, is
+    replayed before the log.
+    """
+
+    def __init__(self, folder: str = "catalog", compact_every: int = 10_000):
+        """Initializes the store.
+
+        Args:
+            folder (str): Folder of the snapshot and the log, created if needed.
+            compact_every (int): Number of log records that starts a new snapshot in the background.
+        """
+        self.__folder = folder
+        self.__compact_every = compact_every
+        self.__catalog = None
+        self.__log = None
+        self.__records = 0
+        self.__compactor = None
+        os.makedirs(folder, exist_ok=True)
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.__folder, name)
+
+    def load(self) -> Catalog:
+        """This method loads the catalog from the snapshot and the log.
+
+        The garbage collector is paused while the videogames are
+        created, since its passes over millions of new objects would
+        take longer than building them.
+
+        Returns:
+            The Catalog, which writes its changes to this store from now on.
+        """
+        catalog = Catalog()
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if os.path.exists(self.__path(SNAPSHOT_NAME)):
+                with open(self.__path(SNAPSHOT_NAME), "rb") as file:
+                    snapshot = pickle.load(file)
+                for category, columns in snapshot["categories"].items():
+                    catalog.extend(map(VideoGame, *columns), category)
+            self.__replay(catalog, self.__path(OLD_LOG_NAME))
+            self.__records = self.__replay(catalog, self.__path(LOG_NAME))
+        finally:
+            if enabled:
+                gc.enable()
+        self.__catalog = catalog
+        self.__log = open(self.__path(LOG_NAME), "ab")
+        catalog.add_journal(self)
+        if os.path.exists(self.__path(OLD_LOG_NAME)):  # the last merge was interrupted
+            self.__start_compactor()
+        return catalog
+
+    @staticmethod
+    def __records_of(path: str):
+        """Yields the records of a log, and truncates a record cut by a crash at its end."""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as file:
+            while True:
+                offset = file.tell()
+                try:
+                    record = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError):
+                    break
+                yield record
+        if offset < os.path.getsize(path):
+            with open(path, "r+b") as file:
+                file.truncate(offset)
+
+    def __replay(self, catalog: Catalog, path: str) -> int:
+        records = 0
+        for action, value in self.__records_of(path):
+            if action == "add":
+                catalog.add(VideoGame(*value))
+            elif action == "remove":
+                catalog.remove(value)
+            elif action == "change":
+                catalog.remove(value[0])
+                catalog.add(VideoGame(*value))
+            records += 1
+        return records
+
+    def __append(self, record: tuple):
+        self.__log.write(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+        self.__log.flush()
+        self.__records += 1
+        if self.__records >= self.__compact_every and not self.__compacting():
+            self.__rotate()
+
+    def __compacting(self) -> bool:
+        return self.__compactor is not None and self.__compactor.is_alive()
+
+    def __rotate(self):
+        """Starts a new log and merges the previous one into the snapshot in a background thread."""
+        if os.path.exists(self.__path(OLD_LOG_NAME)):
+            return  # a previous merge failed, the log keeps growing until compact is called
+        self.__log.close()
+        os.replace(self.__path(LOG_NAME), self.__path(OLD_LOG_NAME))
+        self.__log = open(self.__path(LOG_NAME), "ab")
+        self.__records = 0
+        self.__start_compactor()
+
+    def __start_compactor(self):
+        self.__compactor = threading.Thread(target=self.__merge_old_log, name="catalog-compactor")
+        self.__compactor.start()
+
+    def __merge_old_log(self):
+        """Writes the snapshot plus the old log as a new snapshot, and deletes the old log."""
+        try:
+            states = {}
+            if os.path.exists(self.__path(SNAPSHOT_NAME)):
+                with open(self.__path(SNAPSHOT_NAME), "rb") as file:
+                    snapshot = pickle.load(file)
+                for columns in snapshot["categories"].values():
+                    for state in zip(*columns):
+                        states[state[0]] = state
+            # The same rules as __replay, applied to the states instead of a Catalog.
+            for action, value in self.__records_of(self.__path(OLD_LOG_NAME)):
+                if action == "add":
+                    states.setdefault(value[0], value)
+                elif action == "remove":
+                    states.pop(value, None)
+                elif action == "change":
+                    states.pop(value[0], None)
+                    states[value[0]] = value
+            groups = {}
+            for state in states.values():
+                groups.setdefault(normalize_category(state[5]), []).append(state)
+            self.__write_snapshot({category: [list(column) for column in zip(*group)]
+                                   for category, group in groups.items()})
+            os.remove(self.__path(OLD_LOG_NAME))
+        except Exception as e:  # pylint: disable=broad-except
+            error_log.log(f"ERROR. The catalog log could not be merged into the snapshot: {e}.")
+
+    def __write_snapshot(self, categories: dict):
+        temporary = self.__path(SNAPSHOT_NAME + ".tmp")
+        with open(temporary, "wb") as file:
+            pickle.dump({"version": SNAPSHOT_VERSION, "categories": categories}, file, pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.__path(SNAPSHOT_NAME))
+
+    def added(self, videogame: VideoGame):
+        """This method logs a videogame added to the catalog."""
+        self.__append(("add", videogame.__getstate__()))
+
+    def removed(self, videogame: VideoGame):
+        """This method logs a videogame removed from the catalog."""
+        self.__append(("remove", videogame.get_code()))
+
+    def changed(self, videogame: VideoGame):
+        """This method logs a videogame of the catalog whose price or description changed."""
+        self.__append(("change", videogame.__getstate__()))
+
+    def compact(self):
+        """This method writes a new snapshot of the catalog and empties the logs.
+
+        It waits for a merge running in the background, and writes the
+        whole catalog while the caller waits, so it is meant for
+        moments with no sales, such as closing the application. The
+        snapshot is written to a temporary file and synced before it
+        replaces the previous one, so there is always a complete snapshot.
+        """
+        self.__wait_compactor()
+        categories = {}
+        for category in self.__catalog.categories():
+            states = [videogame.__getstate__() for videogame in self.__catalog.by_category(category)]
+            categories[category] = [list(column) for column in zip(*states)]
+        self.__write_snapshot(categories)
+        if os.path.exists(self.__path(OLD_LOG_NAME)):
+            os.remove(self.__path(OLD_LOG_NAME))
+        self.__log.truncate(0)
+        self.__log.seek(0)
+        self.__records = 0
+
+    def __wait_compactor(self):
+        if self.__compactor is not None:
+            self.__compactor.join()
+            self.__compactor = None
+
+    def close(self):
+        """This method waits for a merge running in the background and closes the log, every change is already written."""
+        self.__wait_compactor()
+        if self.__log is not None:
+            self.__log.close()
+            self.__log = None
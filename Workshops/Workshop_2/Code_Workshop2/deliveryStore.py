@@ -0,0 +1,316 @@
+"""
+This module has a class to store deliveries in batched segment files.
+
+Each segment file holds many deliveries one after another. Every record
+starts with a fixed header (client id, unix timestamp, payload length)
+followed by the pickled Delivery, so the store can be indexed and
+iterated by reading the headers only.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import os
+import re
+import sys
+import glob
+import pickle
+import struct
+from datetime import datetime
+from machines import Machine
+from users import Client, Address
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
+
+error_log = get_log("log.txt")
+
+HEADER = struct.Struct("<qqI")
+SEGMENT_NAME = "segment_{:06d}.dat"
+PICKLE_NAME = re.compile(r"delivery_(\d{4}-\d{2}-\d{2}_\d{6})_\s*(\d+)\.pkl$")
+# Modules where older versions defined Delivery, main.py was usually run as a script
+LEGACY_DELIVERY_MODULES = ("__main__", "main")
+
+
+# pylint: disable=too-few-public-methods
+class Delivery:
+    """This class represents the behavior of a delivery in the application."""
+
+    def __init__(self, client_info: Client, address: Address, machine: Machine):
+        self.__client_info = client_info
+        self.__address = address
+        self.__machine = machine
+
+    def get_client(self) -> Client:
+        """This method returns the client that receives the delivery.
+
+        Returns:
+            The Client of the delivery.
+        """
+        return self.__client_info
+
+    def get_address(self) -> Address:
+        """This method returns the address of the delivery.
+
+        Returns:
+            The Address the machine is sent to.
+        """
+        return self.__address
+
+    def get_machine(self) -> Machine:
+        """This method returns the machine delivered.
+
+        Returns:
+            The Machine of the delivery.
+        """
+        return self.__machine
+
+    def __str__(self) -> str:
+        return f"{'='*10}\nClient: {self.__client_info}\n\
+            Address: {self.__address}\nMachine: {self.__machine}"
+
+
+class _DeliveryUnpickler(pickle.Unpickler):
+    """Unpickler that finds the Delivery class of older versions in this module."""
+
+    def find_class(self, module, name):
+        if name == "Delivery" and module in LEGACY_DELIVERY_MODULES:
+            return Delivery
+        return super().find_class(module, name)
+
+
+def load_delivery(payload: bytes):
+    """This function unpickles a delivery, including the ones pickled by older versions.
+
+    Args:
+        payload (bytes): Pickled delivery.
+
+    Returns:
+        The Delivery.
+    """
+    return _DeliveryUnpickler(io.BytesIO(payload)).load()
+
+
+class DeliveryStore:
+    """This class represents an append-only store of deliveries.
+
+    Deliveries are buffered and written in groups: a commit writes every
+    pending record with one write and one fsync. The store keeps an
+    in-memory index of every record by client id and by date, rebuilt
+    from the record headers when the store is opened.
+    """
+
+    def __init__(self, folder: str = "deliveries", batch_size: int = 64,
+                 max_segment_bytes: int = 64 * 2**20):
+        self.__folder = folder
+        self.__batch_size = batch_size
+        self.__max_segment_bytes = max_segment_bytes
+        self.__pending = []
+        self.__records = []  # (segment, offset, client_id, timestamp, length)
+        self.__by_client = {}
+        self.__by_date = {}
+        self.__segment = 1
+        self.__segment_size = 0
+
+        os.makedirs(folder, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(folder, "segment_*.dat"))):
+            self.__segment = int(os.path.basename(path)[8:14])
+            self.__segment_size = self.__load_segment(self.__segment, path)
+
+    def __segment_path(self, segment: int) -> str:
+        return os.path.join(self.__folder, SEGMENT_NAME.format(segment))
+
+    def __load_segment(self, segment: int, path: str) -> int:
+        """Indexes the headers of a segment, dropping a torn record at its end."""
+        size = os.path.getsize(path)
+        offset = 0
+        with open(path, "rb") as file:
+            while offset + HEADER.size <= size:
+                file.seek(offset)
+                client_id, timestamp, length = HEADER.unpack(file.read(HEADER.size))
+                if offset + HEADER.size + length > size:
+                    break
+                self.__index(segment, offset, client_id, timestamp, length)
+                offset += HEADER.size + length
+        if offset != size:
+            with open(path, "r+b") as file:
+                file.truncate(offset)
+        return offset
+
+    def __index(self, segment: int, offset: int, client_id: int, timestamp: int, length: int):
+        position = len(self.__records)
+        self.__records.append((segment, offset, client_id, timestamp, length))
+        self.__by_client.setdefault(client_id, []).append(position)
+        date = datetime.fromtimestamp(timestamp).date()
+        self.__by_date.setdefault(date, []).append(position)
+
+    def append(self, delivery, client_id: int, timestamp: int = None):
+        """This method adds a delivery to the store.
+
+        The delivery is pickled right away but only written on the next
+        commit, which happens automatically once batch_size deliveries
+        are pending.
+
+        Args:
+            delivery (Delivery): Delivery to be stored.
+            client_id (int): Id of the client that receives the delivery.
+            timestamp (int): Unix time of the delivery, defaults to now.
+        """
+        if timestamp is None:
+            timestamp = int(datetime.now().timestamp())
+        self.append_raw(pickle.dumps(delivery), client_id, timestamp)
+
+    def append_raw(self, payload: bytes, client_id: int, timestamp: int):
+        """This method adds an already pickled delivery to the store.
+
+        Args:
+            payload (bytes): Pickled delivery.
+            client_id (int): Id of the client that receives the delivery.
+            timestamp (int): Unix time of the delivery.
+        """
+        self.__pending.append((client_id, timestamp, payload))
+        if len(self.__pending) >= self.__batch_size:
+            self.commit()
+
+    def commit(self):
+        """This method writes every pending delivery with a single write and fsync."""
+        if not self.__pending:
+            return
+        if self.__segment_size >= self.__max_segment_bytes:
+            self.__segment += 1
+            self.__segment_size = 0
+
+        chunks = []
+        offset = self.__segment_size
+        for client_id, timestamp, payload in self.__pending:
+            chunks.append(HEADER.pack(client_id, timestamp, len(payload)))
+            chunks.append(payload)
+        with open(self.__segment_path(self.__segment), "ab") as file:
+            file.write(b"".join(chunks))
+            file.flush()
+            os.fsync(file.fileno())
+
+        for client_id, timestamp, payload in self.__pending:
+            self.__index(self.__segment, offset, client_id, timestamp, len(payload))
+            offset += HEADER.size + len(payload)
+        self.__segment_size = offset
+        self.__pending = []
+
+    def close(self):
+        """This method commits the pending deliveries."""
+        self.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def iter_raw(self):
+        """This method yields every committed delivery without unpickling it.
+
+        Yields:
+            Tuples (client_id, timestamp, payload) in the order they were stored.
+        """
+        current, file = None, None
+        try:
+            for segment, offset, client_id, timestamp, length in self.__records:
+                if segment != current:
+                    if file is not None:
+                        file.close()
+                    file = open(self.__segment_path(segment), "rb")
+                    current = segment
+                file.seek(offset + HEADER.size)
+                yield client_id, timestamp, file.read(length)
+        finally:
+            if file is not None:
+                file.close()
+
+    def __load(self, positions: list) -> list:
+        deliveries = []
+        for position in positions:
+            segment, offset, _, _, length = self.__records[position]
+            with open(self.__segment_path(segment), "rb") as file:
+                file.seek(offset + HEADER.size)
+                deliveries.append(load_delivery(file.read(length)))
+        return deliveries
+
+    def by_client(self, client_id: int) -> list:
+        """This method returns the deliveries of a client.
+
+        Args:
+            client_id (int): Id of the client.
+
+        Returns:
+            A list with the client's deliveries in the order they were stored.
+        """
+        return self.__load(self.__by_client.get(client_id, []))
+
+    def by_date(self, date) -> list:
+        """This method returns the deliveries of a day.
+
+        Args:
+            date (datetime.date): Day of the deliveries.
+
+        Returns:
+            A list with the deliveries of that day in the order they were stored.
+        """
+        return self.__load(self.__by_date.get(date, []))
+
+    def import_pickle_files(self, folder: str = ".", remove: bool = False) -> int:
+        """This method imports the delivery_<timestamp>_<id>.pkl files of older versions.
+
+        The pickled bytes are copied as they are, the client id and the
+        date are taken from the file name. Every file is loaded first, a
+        file that is not a Delivery whose machine can be printed and
+        priced is logged and left in place.
+
+        Args:
+            folder (str): Folder where the .pkl files are.
+            remove (bool): True to delete every file once it is committed.
+
+        Returns:
+            The number of deliveries imported.
+        """
+        imported = []
+        for path in sorted(glob.glob(os.path.join(folder, "delivery_*.pkl"))):
+            match = PICKLE_NAME.search(os.path.basename(path))
+            if match is None:
+                continue
+            timestamp = int(datetime.strptime(match.group(1), "%Y-%m-%d_%H%M%S").timestamp())
+            with open(path, "rb") as file:
+                payload = file.read()
+            try:
+                delivery = load_delivery(payload)
+                if not isinstance(delivery, Delivery):
+                    raise TypeError(f"it holds a {type(delivery).__name__}")
+                str(delivery)
+                delivery.get_machine().get_total_price()
+            except Exception as e:  # pylint: disable=broad-except
+                error_log.log(f"ERROR. The delivery file {path} could not be imported: {e}.")
+                continue
+            self.append_raw(payload, int(match.group(2)), timestamp)
+            imported.append(path)
+        self.commit()
+        if remove:
+            for path in imported:
+                os.remove(path)
+        return len(imported)
@@ -22,6 +22,9 @@ along with Workshop-SM. If not, see <https://www.gnu.org/licenses/>.
 from abc import ABC, abstractmethod
 from machines import DanceRevolution, ClassicalArcade, Machine, ShootingMachine, RacingMachine, VirtualReality
 
+CATEGORIES = ("dance", "classical", "shooter", "races", "vr")
+MATERIALS = ("wood", "aluminium", "carbon_fiber")
+
 class FactoryMachines(ABC):
     """Abstract Base Class for Factory Machines.
 
@@ -47,13 +50,71 @@ class FactoryMachines(ABC):
         """
         pass
 
+# Constructor arguments of every predefined machine, except material and color:
+# class, dimensions, weight, power consumption, memory, processors, base price
+# and the arguments specific to the category.
+MACHINE_SPECS = {
+    "dance": (DanceRevolution, [270, 245, 250], 370, 750, 512, "PowerPC", 3000,
+              (["easy", "medium", "hard"], ["up", "right", "down", "left"], 400)),
+    "classical": (ClassicalArcade, [65, 50, 170], 70, 200, 16, "SH-2", 500,
+                  (True, True)),
+    "shooter": (ShootingMachine, [75, 100, 200], 100, 300, 512, "ARM Cortex", 3000,
+                (2, "rifle", 1, "automatic", True)),
+    "races": (RacingMachine, [120, 150, 180], 150, 250, 1024, "MIPS R3000/R4000", 3000,
+              ("high pressure", 85, "Sports seat", True)),
+    "vr": (VirtualReality, [150, 200, 250], 250, 1200, 512, "Intel Core i7", 7500,
+           ("Oculus Rift S", "2560 x 1440", 600)),
+}
+
+def specification_price(category: str) -> float:
+    """Returns the price of the predefined machine of a category before the material adjustment.
+
+    It is the base price plus the accessories of the category, such as
+    the controls of the dance machines or the glasses of the virtual
+    reality machines.
+
+    Args:
+        category (str): The category of the machine.
+
+    Returns:
+        float: The price of the machine built from MACHINE_SPECS.
+
+    Raises:
+        ValueError: If the provided category does not exist.
+    """
+    if category not in MACHINE_SPECS:
+        raise ValueError("The category doesn't exist")
+    cls, dimensions, weight, power, memory, processors, base_price, extras = MACHINE_SPECS[category]
+    return cls(None, list(dimensions), weight, power, memory, processors, base_price, None, *extras).get_price()
+
 class PredefinedMachines(FactoryMachines):
     """Concrete Factory for Creating Predefined Arcade Machines.
 
     This factory creates instances of different predefined arcade machines 
-    based on the category provided.
+    based on the category provided. The first machine of every (category, 
+    material) pair is built from MACHINE_SPECS and adjusted by material, 
+    later machines are stamped out from that cached prototype. Only the
+    known MATERIALS are cached, machines of other materials are built
+    every time, so the cache never holds more than one prototype per
+    category and material.
     """
-    
+
+    _prototypes = {}
+
+    def __prototype(self, category: str, material: str) -> Machine:
+        key = (category, material)
+        prototype = PredefinedMachines._prototypes.get(key)
+        if prototype is None:
+            if category not in MACHINE_SPECS:
+                raise ValueError("The category doesn't exist")
+            cls, dimensions, weight, power, memory, processors, base_price, extras = MACHINE_SPECS[category]
+            prototype = cls(material, list(dimensions), weight, power, memory, processors,
+                            base_price, None, *extras)
+            prototype.adjustmentsByMaterial()
+            if material in MATERIALS:
+                PredefinedMachines._prototypes[key] = prototype
+        return prototype
+
     def create_machine(self, category: str, color: str, material: str) -> Machine:
         """Create predefined arcade machines based on category.
 
@@ -69,92 +130,24 @@ class PredefinedMachines(FactoryMachines):
         Raises:
             ValueError: If the provided category does not exist.
         """
-        if category == "dance":
-            danceMachine = DanceRevolution(
-                material,
-                [270, 245, 250], 
-                370,           
-                750,            
-                512,            
-                "PowerPC",      
-                3000,          
-                color,           
-                ["easy", "medium", "hard"],  
-                ["up", "right", "down", "left"],  
-                400              
-            )
-            danceMachine.adjustmentsByMaterial()
-            return danceMachine
-
-        elif category == "classical":
-            classicalMachine = ClassicalArcade(
-                material,
-                [65, 50, 170],  
-                70,          
-                200,        
-                16,           
-                "SH-2",       
-                500,         
-                color,          
-                True,           
-                True          
-            ) 
-            classicalMachine.adjustmentsByMaterial()
-            return classicalMachine
-
-        elif category == "shooter":
-            shooterMachine = ShootingMachine(
-                material,
-                [75, 100, 200], 
-                100,           
-                300,          
-                512,            
-                "ARM Cortex",   
-                3000,      
-                color,        
-                2,           
-                "rifle",     
-                1,              
-                "automatic",    
-                True           
-            )
-            shooterMachine.adjustmentsByMaterial()
-            return shooterMachine
-
-        elif category == "races":
-            racesMachine = RacingMachine(
-                material,
-                [120, 150, 180], 
-                150,            
-                250,             
-                1024,             
-                "MIPS R3000/R4000", 
-                3000,           
-                color,          
-                "high pressure",  
-                85,              
-                "Sports seat",  
-                True             
-            ) 
-            racesMachine.adjustmentsByMaterial()
-            return racesMachine
-
-        elif category == "vr":
-            vrMachine = VirtualReality(
-                material,
-                [150, 200, 250], 
-                250,           
-                1200,         
-                512,            
-                "Intel Core i7",
-                7500,           
-                color,          
-                "Oculus Rift S", 
-                "2560 x 1440",   
-                600            
-            )
-            vrMachine.adjustmentsByMaterial()
-            return vrMachine
-
-        else:
-            raise ValueError("The category doesn't exist")
+        prototype = PredefinedMachines._prototypes.get((category, material)) or self.__prototype(category, material)
+        return prototype.clone(color)
+
+    def create_machines(self, specs) -> list:
+        """Create many predefined arcade machines.
+
+        Args:
+            specs: Iterable of (category, color, material) tuples.
+
+        Returns:
+            list: The machines in the same order as the specs.
+
+        Raises:
+            ValueError: If one of the categories does not exist.
+        """
+        prototypes = PredefinedMachines._prototypes
+        machines = []
+        for category, color, material in specs:
+            prototype = prototypes.get((category, material)) or self.__prototype(category, material)
+            machines.append(prototype.clone(color))
+        return machines
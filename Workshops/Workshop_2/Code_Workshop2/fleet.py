@@ -0,0 +1,160 @@
+"""
+This module has a class to reprice and re-estimate a whole fleet of machines.
+
+NumPy is used when it is installed, otherwise the same operations run
+over the standard library array module. NumPy is optional: without it
+the columns are still compact arrays, but every operation, sums
+included, is a Python loop over them.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from machines import MATERIAL_ADJUSTMENTS
+from factoryMachines import MACHINE_SPECS, MATERIALS, specification_price
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+CLASS_CATEGORIES = {spec[0]: category for category, spec in MACHINE_SPECS.items()}
+
+
+class Fleet:
+    """This class represents a fleet of predefined machines stored as columns.
+
+    The fleet keeps, for every machine, its material and the weight, price
+    and power consumption of its specification before the material
+    adjustment. Adjusting the whole fleet under any table of material
+    rates is then a handful of operations over those columns, vectorized
+    when NumPy is installed and plain loops over arrays otherwise,
+    computed with the same formula as Machine.adjustmentsByMaterial so
+    the results match the per-object method exactly.
+    """
+
+    def __init__(self, specs):
+        """Builds the fleet.
+
+        Args:
+            specs: Iterable of (category, material) pairs, one per machine.
+
+        Raises:
+            ValueError: If one of the categories does not exist.
+        """
+        materials = list(MATERIALS)
+        ids = {material: i for i, material in enumerate(materials)}
+        material_ids = array("I")
+        weights, prices, powers = array("d"), array("d"), array("d")
+        category_prices = {}
+        for category, material in specs:
+            if category not in MACHINE_SPECS:
+                raise ValueError("The category doesn't exist")
+            if material not in ids:
+                ids[material] = len(materials)
+                materials.append(material)
+            _, _, weight, power, _, _, _, _ = MACHINE_SPECS[category]
+            if category not in category_prices:
+                category_prices[category] = specification_price(category)
+            material_ids.append(ids[material])
+            weights.append(weight)
+            prices.append(category_prices[category])
+            powers.append(power)
+
+        self.__materials = materials
+        if numpy is not None:
+            self.__material_ids = numpy.frombuffer(material_ids, dtype=f"u{material_ids.itemsize}")
+            self.__weights = numpy.frombuffer(weights)
+            self.__prices = numpy.frombuffer(prices)
+            self.__powers = numpy.frombuffer(powers)
+        else:
+            self.__material_ids, self.__weights, self.__prices, self.__powers = \
+                material_ids, weights, prices, powers
+
+    @classmethod
+    def from_machines(cls, machines) -> "Fleet":
+        """This method builds the fleet of installed predefined machines.
+
+        Args:
+            machines: Iterable of machines created by PredefinedMachines.
+
+        Returns:
+            The Fleet with one entry per machine.
+        """
+        return cls((CLASS_CATEGORIES[type(machine)], machine.material) for machine in machines)
+
+    def __len__(self) -> int:
+        return len(self.__material_ids)
+
+    def __rates(self, adjustments: dict, column: int) -> list:
+        return [adjustments.get(material, (0.0, 0.0, 0.0))[column] for material in self.__materials]
+
+    def __adjust(self, values, adjustments: dict, column: int):
+        rates = self.__rates(adjustments, column)
+        if numpy is not None:
+            per_machine = numpy.array(rates)[self.__material_ids]
+            return values + values * per_machine
+        return array("d", [value + value * rates[material]
+                           for value, material in zip(values, self.__material_ids)])
+
+    def adjusted(self, adjustments: dict = None) -> tuple:
+        """This method applies material rates to the whole fleet.
+
+        Args:
+            adjustments (dict): Rates of (weight, price, power consumption)
+                by material, defaults to MATERIAL_ADJUSTMENTS. Missing
+                materials are not adjusted.
+
+        Returns:
+            A tuple of three arrays (weights, prices, powers) in fleet order.
+        """
+        if adjustments is None:
+            adjustments = MATERIAL_ADJUSTMENTS
+        return (self.__adjust(self.__weights, adjustments, 0),
+                self.__adjust(self.__prices, adjustments, 1),
+                self.__adjust(self.__powers, adjustments, 2))
+
+    def reprice(self, adjustments: dict = None):
+        """This method returns the price of every machine under material rates.
+
+        Args:
+            adjustments (dict): Rates by material as in adjusted.
+
+        Returns:
+            An array with the price of every machine in fleet order.
+        """
+        if adjustments is None:
+            adjustments = MATERIAL_ADJUSTMENTS
+        return self.__adjust(self.__prices, adjustments, 1)
+
+    def totals(self, adjustments: dict = None) -> dict:
+        """This method sums weight, price and power of the fleet under material rates.
+
+        With NumPy the sums are vectorized, without it they are the
+        builtin sum, a Python loop over each array.
+
+        Args:
+            adjustments (dict): Rates by material as in adjusted.
+
+        Returns:
+            A dictionary with the total weight, price and power consumption.
+        """
+        weights, prices, powers = self.adjusted(adjustments)
+        total = numpy.sum if numpy is not None else sum
+        return {"weight": float(total(weights)), "price": float(total(prices)),
+                "power_consumption": float(total(powers))}
@@ -0,0 +1,250 @@
+"""
+This module has a class to read the ledger of registered machines.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from bisect import bisect_left, bisect_right, insort
+
+INDEXED_FIELDS = ("category", "material", "color")
+INSORT_LIMIT = 256  # new prices inserted one by one, larger batches are merged
+
+
+def format_machine_line(category: str, material: str, color: str, price: float) -> str:
+    """This function formats a registered machine as a line of the ledger file.
+
+    Args:
+        category (str): Category of the machine.
+        material (str): Material of the machine.
+        color (str): Color of the machine.
+        price (float): Total price paid for the machine.
+
+    Returns:
+        A line such as "Dance, Wood, Red, $3650.00" ending in a newline.
+    """
+    return f"{category.capitalize()}, {material.capitalize()}, {color.capitalize()}, ${price:.2f}\n"
+
+
+def parse_machine_line(line: str):
+    """This function parses one line of the registered machines file.
+
+    Args:
+        line (str): Line such as "Dance, Wood, Red, $3650.00".
+
+    Returns:
+        A dictionary with category, material, color and price, or None
+        if the line does not follow the format.
+    """
+    parts = line.strip().split(", ")
+    if len(parts) != 4:
+        return None
+    category, material, color, price = parts
+    try:
+        price = float(price.replace("$", "").replace(",", ""))
+    except ValueError:
+        return None
+    return {"category": category, "material": material, "color": color, "price": price}
+
+
+class MachineLedger:
+    """This class represents an incrementally loaded view of the registered machines file.
+
+    Each call to refresh only parses the bytes appended since the previous
+    call, tracked by file offset and inode. If the file is replaced or
+    truncated the ledger is loaded again from the start. The parsed
+    machines are indexed by category, material, color and price, so
+    searches are answered from memory.
+    """
+
+    def __init__(self, path: str = "registered_machines.txt"):
+        self.__path = path
+        self.__clear()
+
+    def __clear(self):
+        self.__offset = 0
+        self.__inode = None
+        self.__machines = []
+        self.__indexes = {field: {} for field in INDEXED_FIELDS}
+        self.__prices = []
+
+    def refresh(self) -> int:
+        """This method loads the machines appended to the file since the last call.
+
+        Returns:
+            The number of new machines loaded.
+
+        Raises:
+            FileNotFoundError: If the ledger file does not exist.
+        """
+        try:
+            stat = os.stat(self.__path)
+        except FileNotFoundError:
+            self.__clear()
+            raise
+        if stat.st_ino != self.__inode or stat.st_size < self.__offset:
+            self.__clear()
+            self.__inode = stat.st_ino
+        if stat.st_size == self.__offset:
+            return 0
+
+        with open(self.__path, "rb") as file:
+            file.seek(self.__offset)
+            data = file.read(stat.st_size - self.__offset)
+        end = data.rfind(b"\n") + 1  # a partially written last line is left for the next call
+        self.__offset += end
+
+        new_prices = []
+        loaded = 0
+        for line in data[:end].decode("utf-8").splitlines():
+            machine = parse_machine_line(line)
+            if machine is None:
+                continue
+            row = len(self.__machines)
+            self.__machines.append(machine)
+            for field, index in self.__indexes.items():
+                index.setdefault(machine[field].lower(), []).append(row)
+            new_prices.append((machine["price"], row))
+            loaded += 1
+        self.__index_prices(new_prices)
+        return loaded
+
+    def __index_prices(self, new_prices: list):
+        """Adds (price, row) pairs to the sorted price index without sorting it again.
+
+        Only the new pairs are sorted. A few are inserted one by one, each
+        insertion moving part of the index in memory. A larger batch is
+        appended as a second sorted run, which list.sort recognizes and
+        merges in a single linear pass.
+        """
+        new_prices.sort()
+        if len(new_prices) <= INSORT_LIMIT:
+            for pair in new_prices:
+                insort(self.__prices, pair)
+        else:
+            self.__prices.extend(new_prices)
+            self.__prices.sort()
+
+    def get_machines(self) -> list:
+        """This method returns all loaded machines in the order they were registered.
+
+        Returns:
+            A list of dictionaries with category, material, color and price.
+        """
+        return self.__machines
+
+    def count_with(self, field: str, values) -> int:
+        """This method counts the loaded machines whose field has one of the given values.
+
+        Args:
+            field (str): "category", "material" or "color".
+            values: Values of the field in lower case.
+
+        Returns:
+            The number of machines, found in the index of the field.
+        """
+        index = self.__indexes[field]
+        return sum(len(index.get(value, ())) for value in set(values))
+
+    def rows_with(self, field: str, values) -> list:
+        """This method returns the rows of the machines whose field has one of the given values.
+
+        Args:
+            field (str): "category", "material" or "color".
+            values: Values of the field in lower case.
+
+        Returns:
+            A list of positions in get_machines, in the order they were registered.
+        """
+        index = self.__indexes[field]
+        lists = [index.get(value, []) for value in set(values)]
+        if len(lists) == 1:
+            return list(lists[0])
+        return sorted(row for rows in lists for row in rows)
+
+    def __price_positions(self, low: float, high: float) -> tuple:
+        low = low if low is not None else float("-inf")
+        high = high if high is not None else float("inf")
+        return bisect_left(self.__prices, (low,)), bisect_right(self.__prices, (high, float("inf")))
+
+    def count_by_price(self, low: float = None, high: float = None) -> int:
+        """This method counts the loaded machines within a price range.
+
+        Args:
+            low (float): Lowest price included, or None.
+            high (float): Highest price included, or None.
+
+        Returns:
+            The number of machines, found by bisecting the price index.
+        """
+        start, end = self.__price_positions(low, high)
+        return max(0, end - start)
+
+    def rows_by_price(self, low: float = None, high: float = None) -> list:
+        """This method returns the rows of the machines within a price range.
+
+        Args:
+            low (float): Lowest price included, or None.
+            high (float): Highest price included, or None.
+
+        Returns:
+            A list of positions in get_machines, from the cheapest machine.
+        """
+        start, end = self.__price_positions(low, high)
+        return [row for _, row in self.__prices[start:end]]
+
+    def search(self, min_price: float = None, max_price: float = None,
+               material: str = None, category: str = None) -> list:
+        """This method returns the loaded machines that match every given criterion.
+
+        The candidates are taken from the most selective index among the
+        given criteria, and only those are checked against the rest.
+
+        Args:
+            min_price (float): Lowest price included, or None.
+            max_price (float): Highest price included, or None.
+            material (str): Material of the machine in any letter case, or None.
+            category (str): Category of the machine in any letter case, or None.
+
+        Returns:
+            A list with the matching machines in the order they were registered.
+        """
+        candidates = []
+        if min_price is not None or max_price is not None:
+            candidates.append(self.rows_by_price(min_price, max_price))
+        if material:
+            candidates.append(self.__indexes["material"].get(material.lower(), []))
+        if category:
+            candidates.append(self.__indexes["category"].get(category.lower(), []))
+        if not candidates:
+            return list(self.__machines)
+
+        rows = min(candidates, key=len)
+        matches = []
+        for row in sorted(rows):
+            machine = self.__machines[row]
+            if min_price is not None and machine["price"] < min_price:
+                continue
+            if max_price is not None and machine["price"] > max_price:
+                continue
+            if material and machine["material"].lower() != material.lower():
+                continue
+            if category and machine["category"].lower() != category.lower():
+                continue
+            matches.append(machine)
+        return matches
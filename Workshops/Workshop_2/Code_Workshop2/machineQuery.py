@@ -0,0 +1,255 @@
+"""
+This module has a small query language to search the registered machines.
+
+A query is a list of clauses separated by spaces, for example:
+
+    category=dance material in (wood,aluminium) price 1000..5000 color~red order by price desc limit 20
+
+    field=value              category, material or color equal to value
+    field in (a,b,...)       category, material or color equal to one of the values
+    field~text               category, material or color containing text
+    price low..high          price within the range, either end may be left out
+    price<=x, price>=x, price<x, price>x, price=x
+    order by field [asc|desc]
+    limit n
+
+Text is compared in any letter case. A query is compiled once into a
+single predicate, and it is run over the rows of the most selective
+ledger index among its clauses.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+import heapq
+from itertools import islice
+from operator import itemgetter
+from ledger import MachineLedger, INDEXED_FIELDS
+
+FIELDS = INDEXED_FIELDS + ("price",)
+NUMBER = r"\d+(?:\.\d+)?"
+VALUE = r'"[^"]*"|[^\s(),"]+'
+CLAUSES = (
+    ("order", re.compile(r"order\s+by\s+(\w+)(?:\s+(asc|desc)\b)?", re.I)),
+    ("limit", re.compile(r"limit\s+(\d+)\b", re.I)),
+    ("range", re.compile(rf"price\s+({NUMBER})?\s*\.\.\s*({NUMBER})?", re.I)),
+    ("compare", re.compile(rf"price\s*(<=|>=|<|>|=)\s*({NUMBER})", re.I)),
+    ("in", re.compile(r"(\w+)\s+in\s*\(([^)]*)\)", re.I)),
+    ("text", re.compile(rf"(\w+)\s*(=|~)\s*({VALUE})", re.I)),
+)
+
+# Source of the test of every kind of condition, {v} is the name of its value
+TESTS = {
+    "=": 'm["{field}"].lower() == {v}',
+    "in": 'm["{field}"].lower() in {v}',
+    "~": '{v} in m["{field}"].lower()',
+    "price=": 'm["price"] == {v}',
+    "price<": 'm["price"] < {v}',
+    "price<=": 'm["price"] <= {v}',
+    "price>": 'm["price"] > {v}',
+    "price>=": 'm["price"] >= {v}',
+}
+
+
+class MachineQuery:
+    """This class represents a compiled search over the registered machines.
+
+    The conditions are (field, operator, value) tuples, with the
+    operators "=", "in" and "~" for category, material and color, and
+    "=", "<", "<=", ">" and ">=" for price. Queries can be built from
+    text with parse or directly from conditions.
+    """
+
+    def __init__(self, conditions=(), order_by: str = None, descending: bool = False, limit: int = None):
+        """Compiles the query.
+
+        Args:
+            conditions: Iterable of (field, operator, value) tuples, all of them must hold.
+            order_by (str): Field to sort the results by, or None to keep the registration order.
+            descending (bool): True to sort from the highest value.
+            limit (int): Maximum number of results, or None.
+
+        Raises:
+            ValueError: If a field or an operator is not valid.
+        """
+        self.__conditions = []
+        for field, operator, value in conditions:
+            field = field.lower()
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field '{field}', use one of {', '.join(FIELDS)}")
+            if field == "price":
+                if operator not in ("=", "<", "<=", ">", ">="):
+                    raise ValueError(f"The price can't be compared with '{operator}'")
+                value = float(value)
+            elif operator == "in":
+                value = frozenset(str(item).lower() for item in value)
+            elif operator in ("=", "~"):
+                value = str(value).lower()
+            else:
+                raise ValueError(f"The {field} can't be compared with '{operator}'")
+            self.__conditions.append((field, operator, value))
+        if order_by is not None and order_by.lower() not in FIELDS:
+            raise ValueError(f"Unknown field '{order_by}', use one of {', '.join(FIELDS)}")
+        self.__order_by = order_by.lower() if order_by is not None else None
+        self.__descending = descending
+        self.__limit = limit
+        self.matches = self.__compile()
+
+    @classmethod
+    def parse(cls, text: str) -> "MachineQuery":
+        """This method compiles a query written in the query language.
+
+        Args:
+            text (str): The query, as described in the module documentation.
+
+        Returns:
+            The MachineQuery.
+
+        Raises:
+            ValueError: If the query can't be understood.
+        """
+        conditions = []
+        order_by, descending, limit = None, False, None
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            for kind, pattern in CLAUSES:
+                match = pattern.match(text, position)
+                if match:
+                    break
+            else:
+                raise ValueError(f"The query can't be understood from: {text[position:]}")
+            if kind == "order":
+                order_by, descending = match.group(1), (match.group(2) or "").lower() == "desc"
+            elif kind == "limit":
+                limit = int(match.group(1))
+            elif kind == "range":
+                low, high = match.groups()
+                if low is None and high is None:
+                    raise ValueError("A price range needs at least one end")
+                if low is not None:
+                    conditions.append(("price", ">=", low))
+                if high is not None:
+                    conditions.append(("price", "<=", high))
+            elif kind == "compare":
+                conditions.append(("price", match.group(1), match.group(2)))
+            elif kind == "in":
+                values = [value.strip().strip('"') for value in match.group(2).split(",") if value.strip()]
+                conditions.append((match.group(1), "in", values))
+            else:
+                conditions.append((match.group(1), match.group(2), match.group(3).strip('"')))
+            position = match.end()
+            while position < len(text) and text[position].isspace():
+                position += 1
+        return cls(conditions, order_by, descending, limit)
+
+    def __compile(self):
+        """Builds one function that tests every condition of the query on a machine.
+
+        The function is generated from the fixed sources in TESTS, the
+        values of the conditions are passed in its namespace, never as
+        source code.
+        """
+        namespace = {"__builtins__": {}}
+        tests = []
+        for number, (field, operator, value) in enumerate(self.__conditions):
+            name = f"v{number}"
+            namespace[name] = value
+            key = "price" + operator if field == "price" else operator
+            tests.append(TESTS[key].format(field=field, v=name))
+        source = "lambda m: " + (" and ".join(tests) if tests else "True")
+        return eval(source, namespace)  # pylint: disable=eval-used
+
+    def __price_bounds(self) -> tuple:
+        low = high = None
+        for field, operator, value in self.__conditions:
+            if field != "price":
+                continue
+            if operator in (">", ">=", "=") and (low is None or value > low):
+                low = value
+            if operator in ("<", "<=", "=") and (high is None or value < high):
+                high = value
+        return low, high
+
+    def __candidates(self, ledger: MachineLedger):
+        """Returns the rows of the most selective index, and whether they are in price order."""
+        best = None
+        for field, operator, value in self.__conditions:
+            if field != "price" and operator in ("=", "in"):
+                values = [value] if operator == "=" else value
+                count = ledger.count_with(field, values)
+                if best is None or count < best[0]:
+                    best = (count, field, values)
+        low, high = self.__price_bounds()
+        if low is not None or high is not None:
+            count = ledger.count_by_price(low, high)
+            if best is None or count < best[0]:
+                return ledger.rows_by_price(low, high), True
+        if best is not None:
+            return ledger.rows_with(best[1], best[2]), False
+        if self.__order_by == "price":
+            return ledger.rows_by_price(), True
+        return range(len(ledger.get_machines())), False
+
+    def run(self, ledger: MachineLedger) -> list:
+        """This method returns the machines of a ledger that match the query.
+
+        When the candidate rows come from the price index and the query
+        is ordered by price, they are already sorted and the search
+        stops as soon as the limit is reached.
+
+        Args:
+            ledger (MachineLedger): Ledger to search, already refreshed.
+
+        Returns:
+            A list with the matching machines as dictionaries.
+        """
+        machines = ledger.get_machines()
+        rows, by_price = self.__candidates(ledger)
+        if by_price and self.__order_by == "price":
+            if self.__descending:
+                rows = reversed(rows)
+            matches = filter(self.matches, map(machines.__getitem__, rows))
+            return list(islice(matches, self.__limit))
+
+        matches = filter(self.matches, map(machines.__getitem__, sorted(rows) if by_price else rows))
+        if self.__order_by is None:
+            return list(islice(matches, self.__limit))
+        key = itemgetter(self.__order_by)
+        if self.__order_by != "price":
+            key = lambda machine: machine[self.__order_by].lower()  # pylint: disable=unnecessary-lambda-assignment
+        if self.__limit is not None:
+            select = heapq.nlargest if self.__descending else heapq.nsmallest
+            return select(self.__limit, matches, key=key)
+        return sorted(matches, key=key, reverse=self.__descending)
+
+
+def search_machines(ledger: MachineLedger, text: str) -> list:
+    """This function runs a query written in the query language over a ledger.
+
+    Args:
+        ledger (MachineLedger): Ledger to search, already refreshed.
+        text (str): The query.
+
+    Returns:
+        A list with the matching machines as dictionaries.
+
+    Raises:
+        ValueError: If the query can't be understood.
+    """
+    return MachineQuery.parse(text).run(ledger)
@@ -23,11 +23,25 @@ along with Workshop-SM. If not, see <https://www.gnu.org/licenses/>.
 from abc import ABC, abstractmethod
 from videogames import VideoGame
 
+# Relative change of (weight, price, power consumption) caused by each material
+MATERIAL_ADJUSTMENTS = {
+    "wood": (0.1, -0.05, 0.15),
+    "aluminium": (-0.05, 0.1, 0.0),
+    "carbon_fiber": (-0.15, 0.2, -0.1),
+}
+
 #================================ Abstract class =============================================
 
 class Machine(ABC):
     """This class represents the behavior of a general
-    machine in the application, it acts as an abstract class."""
+    machine in the application, it acts as an abstract class.
+
+    The summary returned by __str__ is cached until the machine changes:
+    adding or removing a videogame, a price change of one of them, or a
+    material adjustment.
+    """
+
+    MEMORY_UNIT = "MB"
 
     def __init__(self, material: str, dimensions: list, weight: float, power_consumption: float,
                   memory: int, processors: str, base_price: float):
@@ -39,16 +53,46 @@ class Machine(ABC):
         self.__processors = processors
         self.__base_price = base_price
         self.__price = base_price
-        self.__videogames = []
+        self.__videogames = {}
+        self.__videogames_price = 0
+        self.__render_cache = None
 
     def get_videogames(self):
         """This method returns the videogames of the machine.
         
         Returns:
-            A list with the videogames of the machine.
+            A list with the GameVariant of every videogame of the machine
+            in the order they were added.
+        """
+        return list(self.__videogames.values())
+
+    def has_videogame(self, code: int) -> bool:
+        """This method checks if a videogame is installed in the machine.
+
+        Args:
+            code (int): Code of the videogame.
+
+        Returns:
+            True if the machine has a videogame with that code.
         """
-        return self.__videogames
+        return code in self.__videogames
     
+    def get_weight(self):
+        """This method returns the weight of the machine.
+        
+        Returns:
+            A float with the weight of the machine in kg.
+        """
+        return self.__weight
+
+    def get_power_consumption(self):
+        """This method returns the power consumption of the machine.
+        
+        Returns:
+            A float with the power consumption of the machine in W.
+        """
+        return self.__power_consumption
+
     def get_price(self):
         """This method returns the price of the machine.
         
@@ -57,31 +101,112 @@ class Machine(ABC):
         """
         return self.__price
 
+    def get_videogames_price(self):
+        """This method returns the price of the videogames of the machine.
+
+        The total is kept up to date as videogames are added and removed
+        and as their prices change, so it is never recomputed.
+        
+        Returns:
+            A float with the sum of the prices of the videogames.
+        """
+        return self.__videogames_price
+
+    def get_total_price(self):
+        """This method returns the price of the machine with its videogames.
+        
+        Returns:
+            A float with the machine price plus the price of the videogames.
+        """
+        return self.__price + self.__videogames_price
+
     @abstractmethod
-    def add_videogame(self, videogame: VideoGame):
+    def add_videogame(self, videogame):
         """This method adds a videogame to the current machine.
 
         In this method a videogame is received as argument,
         following a VideoGame abstract data type, and it is 
-        add to internal games list.
+        add to internal games, indexed by code. A videogame
+        whose code is already in the machine is rejected.
+        The machine keeps the shared GameVariant of the
+        videogame, a plain VideoGame is added without high
+        definition.
 
         Args:
-            videogame (VideoGame): videogame to be added
+            videogame (VideoGame | GameVariant): videogame to be added
+        """
+        if isinstance(videogame, VideoGame):
+            videogame = videogame.variant(False)
+        code = videogame.get_code()
+        if code in self.__videogames:
+            print(f"VideoGame with code {code} is already in the machine.")
+            return
+        self.__videogames[code] = videogame
+        self.__videogames_price += videogame.get_price()
+        self.__render_cache = None
+        videogame.add_watcher(self)
+
+    def price_changed(self, videogame: VideoGame, old_price: float):
+        """This method updates the videogames total when one of their prices changes.
+
+        Args:
+            videogame (VideoGame): Videogame whose price changed.
+            old_price (float): Price the videogame had before.
+        """
+        variant = self.__videogames.get(videogame.get_code())
+        if variant is None or variant.get_videogame() is not videogame:
+            return
+        self.__videogames_price += variant.get_price() - variant.price_for(old_price)
+        self.__render_cache = None
+
+    def clone(self, color: str):
+        """This method returns a new machine with the same specification.
+
+        The copy has its own copies of the specification lists, such as
+        the dimensions, and its own empty list of videogames, it is used
+        by the factory to stamp out machines from prototypes.
+
+        Args:
+            color (str): Color of the new machine.
+
+        Returns:
+            A machine of the same class with the given color.
         """
-        self.__videogames.append(videogame)
+        machine = object.__new__(self.__class__)
+        machine.__dict__ = self.__dict__.copy()
+        machine.__dimensions = list(self.__dimensions)
+        machine.color = color
+        machine.__videogames = {}
+        machine.__videogames_price = 0
+        machine.__render_cache = None
+        return machine
 
     def adjustmentsByMaterial(self):
-        if self.material=="wood":
-            self.__weight= self.__weight+(self.__weight*0.1)
-            self.__price= self.__price-(self.__price*0.05)
-            self.__power_consumption= self.__power_consumption+(self.__power_consumption*0.15)
-        if self.material=="aluminium":
-            self.__weight= self.__weight-(self.__weight*0.05)
-            self.__price= self.__price+(self.__price*0.1)
-        if self.material=="carbon_fiber":
-            self.__weight= self.__weight-(self.__weight*0.15)
-            self.__price= self.__price+(self.__price*0.2)
-            self.__power_consumption= self.__power_consumption-(self.__power_consumption*0.1)
+        """This method adjusts weight, price and power consumption by material.
+
+        Every value changes by the rate that MATERIAL_ADJUSTMENTS gives
+        for the material of the machine, unknown materials change nothing.
+        """
+        if self.material not in MATERIAL_ADJUSTMENTS:
+            return
+        weight_rate, price_rate, power_rate = MATERIAL_ADJUSTMENTS[self.material]
+        self.__weight= self.__weight+(self.__weight*weight_rate)
+        self.__price= self.__price+(self.__price*price_rate)
+        if power_rate:
+            self.__power_consumption= self.__power_consumption+(self.__power_consumption*power_rate)
+        self.__render_cache = None
+
+    def _add_to_price(self, amount: float):
+        """This method adds the price of an accessory, such as controls or glasses, to the machine price.
+
+        Subclasses call it from their constructor, before the material
+        adjustment, so the accessory is adjusted with the machine.
+
+        Args:
+            amount (float): Price of the accessory.
+        """
+        self.__price = self.__price + amount
+        self.__render_cache = None
 
     def remove_videogame(self, code: int):
         """This method removes a videogame from the machine.
@@ -92,14 +217,11 @@ class Machine(ABC):
         Args:
             code (int): Code of the videogame to be removed.
         """
-        index = -1 # logic mark
-        for i, vg in enumerate(self.__videogames):
-            if vg.get_code() == code:
-                index = i
-                break
-
-        if index != -1: # videogame is in machine
-            self.__videogames.pop(index)
+        videogame = self.__videogames.pop(code, None)
+        if videogame is not None: # videogame is in machine
+            self.__videogames_price -= videogame.get_price()
+            self.__render_cache = None
+            videogame.remove_watcher(self)
         else:
             print(f"VideoGame with code {code} it not in the machine.")
 
@@ -111,27 +233,92 @@ class Machine(ABC):
         """
         if len(self.__videogames) > 0:
             print("Code\tName")
-            for vg in self.__videogames:
+            for vg in self.__videogames.values():
                 print(vg)
         else:
             print("No videogames have been added.")
 
+    def _describe(self) -> list:
+        """This method returns the lines that describe a specific kind of machine.
+
+        Subclasses override it to add their own attributes to the summary,
+        between the processors and the base price.
+
+        Returns:
+            A list of strings, one per line.
+        """
+        return []
+
+    def __render(self):
+        """Yields the summary of the machine piece by piece."""
+        header = [f"{'*' * 15}", f"Material: {self.material}"]
+        if hasattr(self, "color"):
+            header.append(f"Color: {self.color}")
+        header += [
+            f"Dimensions: {self.__dimensions} cm",
+            f"Weight: {self.__weight} kg",
+            f"Power Consumption: {self.__power_consumption} W",
+            f"Memory: {self.__memory} {self.MEMORY_UNIT}",
+            f"Processors: {self.__processors}",
+        ]
+        header += self._describe()
+        header += [f"Base Price: ${self.__base_price:.2f}", "Videogames:\n"]
+        yield "\n".join(header)
+
+        if not self.__videogames:
+            yield "No videogames installed"
+        for vg in self.__videogames.values():
+            yield str(vg)
+            yield "\n"
+
+    def write_to(self, fileobj):
+        """This method writes the summary of the machine to a file.
+
+        The summary is written piece by piece, so it is never built as a
+        single string unless it is already cached.
+
+        Args:
+            fileobj: Text file or stream, such as sys.stdout.
+        """
+        cache = self.__render_cache
+        if cache is not None and cache[:2] == (self.material, getattr(self, "color", None)):
+            fileobj.write(cache[2])
+            return
+        for piece in self.__render():
+            fileobj.write(piece)
+
+    def __getstate__(self) -> dict:
+        """Returns the state to be pickled, the cached summary is not part of it."""
+        state = self.__dict__.copy()
+        state["_Machine__render_cache"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restores a pickled machine, including the ones pickled by older versions.
+
+        Older versions kept the videogames in a list and had no videogames
+        total nor cached summary, so the list becomes the dictionary by
+        code, with the videogames as installed without high definition,
+        and the total is computed from it.
+        """
+        self.__dict__.update(state)
+        videogames = self.__videogames
+        if isinstance(videogames, list):
+            self.__videogames = {}
+            for videogame in videogames:
+                if isinstance(videogame, VideoGame):
+                    videogame = videogame.variant(False)
+                self.__videogames.setdefault(videogame.get_code(), videogame)
+        if "_Machine__videogames_price" not in state:
+            self.__videogames_price = sum(videogame.get_price() for videogame in self.__videogames.values())
+        self.__render_cache = None
+
     def __str__(self) -> str:
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} MB\n"
-            f"Processors: {self.__processors}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-        )
+        cache = self.__render_cache
+        key = (self.material, getattr(self, "color", None))
+        if cache is None or cache[:2] != key:
+            cache = self.__render_cache = key + ("".join(self.__render()),)
+        return cache[2]
 
 #================================== Concrete class =========================================
 class DanceRevolution(Machine):
@@ -142,13 +329,28 @@ class DanceRevolution(Machine):
                   memory: int, processors: str, base_price: float, color: str, difficulties: list, arrow_cardinalities: list, 
                   controls_price: float):
         
-        super.__init__(material,dimensions,weight,power_consumption,memory,processors,base_price)
+        super().__init__(material,dimensions,weight,power_consumption,memory,processors,base_price)
         self.color = color
-        self.__price = base_price + controls_price
+        self._add_to_price(controls_price)
         self.__difficulties = difficulties
         self.__arrow_cardinalities = arrow_cardinalities
         self.__controls_price = controls_price
 
+    def clone(self, color: str):
+        """This method returns a new machine with the same specification.
+
+        Args:
+            color (str): Color of the new machine.
+
+        Returns:
+            A DanceRevolution with the given color and its own lists of
+            difficulties and arrow cardinalities.
+        """
+        machine = super().clone(color)
+        machine.__difficulties = list(self.__difficulties)
+        machine.__arrow_cardinalities = list(self.__arrow_cardinalities)
+        return machine
+
     def add_videogame(self, videogame: VideoGame):
         """This method adds a videogame to the current Dance Revolution machine.
 
@@ -159,36 +361,20 @@ class DanceRevolution(Machine):
         Args:
             videogame (VideoGame): videogame to be added
         """
-        if videogame.get_category=="dance":
-            self.__videogames.append(videogame)
+        if videogame.get_category()=="dance":
+            super().add_videogame(videogame)
         else:
             print(f"The videogame can not be added because its category is not compatible")
 
-    def __str__(self) -> str:
-        difficulties_str = ', '.join(self.__difficulties)
-        arrow_cardinalities_str = ', '.join(self.__arrow_cardinalities)
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Color: {self.color}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} MB\n"
-            f"Processors: {self.__processors}\n"
-            f"Difficulties: {difficulties_str}\n"
-            f"Arrow Cardinalities: {arrow_cardinalities_str}\n"
-            f"Controls Price: ${self.__controls_price:.2f}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-            )
-        
+    def _describe(self) -> list:
+        return [
+            f"Difficulties: {', '.join(self.__difficulties)}",
+            f"Arrow Cardinalities: {', '.join(self.__arrow_cardinalities)}",
+            f"Controls Price: ${self.__controls_price:.2f}",
+        ]
 
     
+
 class ClassicalArcade(Machine):
     """This class represents the behavior of a classical arcade
     machine in the application."""
@@ -196,7 +382,7 @@ class ClassicalArcade(Machine):
     def __init__(self, material: str, dimensions: list, weight: float, power_consumption: float,
                   memory: int, processors: str, base_price: float, color: str, make_vibration: bool, sound_record_alert: bool):
         
-        super.__init__(material,dimensions,weight,power_consumption,memory,processors,base_price)
+        super().__init__(material,dimensions,weight,power_consumption,memory,processors,base_price)
         self.color = color
         self.__make_vibration = make_vibration
         self.__sound_record_alert = sound_record_alert
@@ -211,12 +397,12 @@ class ClassicalArcade(Machine):
         Args:
             videogame (VideoGame): videogame to be added
         """
-        if videogame.get_category=="classical":
-            self.__videogames.append(videogame)
+        if videogame.get_category()=="classical":
+            super().add_videogame(videogame)
         else:
             print(f"The videogame can not be added because its category is not compatible")
 
-    def __str__(self) -> str:
+    def _describe(self) -> list:
         vibration=""
         if self.__make_vibration==True:
             vibration="Yes"
@@ -229,25 +415,12 @@ class ClassicalArcade(Machine):
         else:
             alert="No"
 
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Color: {self.color}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} MB\n"
-            f"Processors: {self.__processors}\n"
-            f"Vibration: {vibration}\n"
-            f"Sound Record Alert: {alert}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-            )
+        return [
+            f"Vibration: {vibration}",
+            f"Sound Record Alert: {alert}",
+        ]
     
+
 class ShootingMachine(Machine):
     def __init__(self, material: str, dimensions: list, weight: float, power_consumption: float,
                  memory: int, processors: str, base_price: float, color: str, number_of_guns: int, 
@@ -271,34 +444,22 @@ class ShootingMachine(Machine):
         Args:
             videogame (VideoGame): videogame to be added
         """
-        if videogame.get_category=="shooter":
-            self.__videogames.append(videogame)
+        if videogame.get_category()=="shooter":
+            super().add_videogame(videogame)
         else:
             print(f"The videogame can not be added because its category is not compatible")
 
-    def __str__(self) -> str:
+    def _describe(self) -> list:
         safety_lock_str = "Yes" if self.__safety_lock else "No"
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Color: {self.color}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} MB\n"
-            f"Processors: {self.__processors}\n"
-            f"Number of Guns: {self.__number_of_guns}\n"
-            f"Gun Type: {self.__gun_type}\n"
-            f"Gun Accuracy: {self.__gun_accuracy}%\n"
-            f"Reload Mechanism: {self.__reload_mechanism}\n"
-            f"Safety Lock: {safety_lock_str}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-        )
+        return [
+            f"Number of Guns: {self.__number_of_guns}",
+            f"Gun Type: {self.__gun_type}",
+            f"Gun Accuracy: {self.__gun_accuracy}%",
+            f"Reload Mechanism: {self.__reload_mechanism}",
+            f"Safety Lock: {safety_lock_str}",
+        ]
     
+
 class RacingMachine(Machine):
     def __init__(self, material: str, dimensions: list, weight: float, power_consumption: float,
                  memory: int, processors: str, base_price: float, color: str, wheel_type: str, 
@@ -321,41 +482,31 @@ class RacingMachine(Machine):
         Args:
             videogame (VideoGame): videogame to be added
         """
-        if videogame.get_category=="races":
-            self.__videogames.append(videogame)
+        if videogame.get_category()=="races":
+            super().add_videogame(videogame)
         else:
             print(f"The videogame can not be added because its category is not compatible")
 
-    def __str__(self) -> str:
+    def _describe(self) -> list:
         vibration_str = "Yes" if self.__has_vibration else "No"
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Color: {self.color}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} MB\n"
-            f"Processors: {self.__processors}\n"
-            f"Wheel Type: {self.__wheel_type}\n"
-            f"Pedal Sensitivity: {self.__pedal_sensitivity}%\n"
-            f"Seat Type: {self.__seat_type}\n"
-            f"Has Vibration: {vibration_str}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-        )
+        return [
+            f"Wheel Type: {self.__wheel_type}",
+            f"Pedal Sensitivity: {self.__pedal_sensitivity}%",
+            f"Seat Type: {self.__seat_type}",
+            f"Has Vibration: {vibration_str}",
+        ]
+
 
 class VirtualReality(Machine):
+    MEMORY_UNIT = "GB"
+
     def __init__(self, material: str, dimensions: list, weight: float, power_consumption: float,
                  memory: int, processors: str, base_price: float, color: str, glasses_type: str, 
                  glasses_resolution: str, glasses_price: float):
         
         super().__init__(material, dimensions, weight, power_consumption, memory, processors, base_price)
         self.color = color
-        self.__price = base_price + glasses_price
+        self._add_to_price(glasses_price)
         self.__glasses_type = glasses_type
         self.__glasses_resolution = glasses_resolution
         self.__glasses_price = glasses_price
@@ -370,28 +521,14 @@ class VirtualReality(Machine):
         Args:
             videogame (VideoGame): videogame to be added
         """
-        if videogame.get_category=="vr":
-            self.__videogames.append(videogame)
+        if videogame.get_category()=="vr":
+            super().add_videogame(videogame)
         else:
             print(f"The videogame can not be added because its category is not compatible")
 
-    def __str__(self) -> str:
-        temp_videogames = ""
-        for vg in self.__videogames:
-            temp_videogames += str(vg) + "\n"
-        return (
-            f"{'*' * 15}\n"
-            f"Material: {self.material}\n"
-            f"Color: {self.color}\n"
-            f"Dimensions: {self.__dimensions} cm\n"
-            f"Weight: {self.__weight} kg\n"
-            f"Power Consumption: {self.__power_consumption} W\n"
-            f"Memory: {self.__memory} GB\n"
-            f"Processors: {self.__processors}\n"
-            f"Glasses Type: {self.__glasses_type}\n"
-            f"Glasses Resolution: {self.__glasses_resolution}\n"
-            f"Glasses Price: {self.__glasses_price:.2f}\n"
-            f"Base Price: ${self.__base_price:.2f}\n"
-            f"Videogames:\n{temp_videogames if temp_videogames else 'No videogames installed'}"
-        )
-
+    def _describe(self) -> list:
+        return [
+            f"Glasses Type: {self.__glasses_type}",
+            f"Glasses Resolution: {self.__glasses_resolution}",
+            f"Glasses Price: {self.__glasses_price:.2f}",
+        ]
@@ -19,38 +19,39 @@ You should have received a copy of the GNU General Public License
 along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+import os
 import sys
-import pickle
 import re
-from datetime import datetime
 from videogames import VideoGame
-from machines import Machine
 from users import User, Client, Manager, Address
 from factoryMachines import PredefinedMachines
+from catalog import normalize_category
+from catalogStore import CatalogStore
+from concurrentCatalog import ConcurrentCatalog
+from search import SearchIndex
+from ledger import MachineLedger, format_machine_line
+from machineQuery import search_machines
+from deliveryStore import Delivery, DeliveryStore
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
 
-# pylint: disable=too-few-public-methods
-class Delivery:
-    """This class represents the behavior of a delivery in the application."""
+error_log = get_log("log.txt")
 
-    def __init__(self, client_info: Client, address: Address, machine: Machine):
-        self.__client_info = client_info
-        self.__address = address
-        self.__machine = machine
-
-    def __str__(self) -> str:
-        return f"{'='*10}\nClient: {self.__client_info}\n\
-            Address: {self.__address}\nMachine: {self.__machine}"
 
 #=========================================================================================================
 class Main:
     """This class represents the main behavior of the application."""
 
     MENU_ADMIN = "1.Add Videogame\n2.Remove Videogame\n3.Exit"
-    MENU_CLIENT = "1.Buy Machine\n2.Show Registered Machines\n3.Show Videogames\n4.Exit"
+    MENU_CLIENT = "1.Buy Machine\n2.Show Registered Machines\n3.Show Videogames\n4.Search Videogames\n5.Exit"
 
     def __init__(self, user: User):
-        self.__catalog = []
+        self.__catalog_store = CatalogStore("catalog")
+        self.__catalog = ConcurrentCatalog(self.__catalog_store.load())
+        self.__search = SearchIndex(self.__catalog)
+        self.__ledger = MachineLedger("registered_machines.txt")
+        self.__deliveries = DeliveryStore("deliveries")
         self.__temp_machine = None
         self.__user: User = user
 
@@ -58,19 +59,19 @@ class Main:
         """This method changes the current user."""
         self.__user = user
 
-    def __validate_videogame_code(self, code: int, machine: Machine) -> bool:
+    def __validate_videogame_code(self, code: int):
         """This method validates if a videogame code already exists in the catalog.
 
         In this method, the code of a videogame is received as argument,
-        and it is validated if it already exists in the catalog.
+        and it is looked up in the catalog index.
 
         Args:
             code (int): Code of the videogame to be validated.
+
+        Returns:
+            The VideoGame with that code, or None if it is not in the catalog.
         """
-        for i, vg in enumerate(self.__catalog):
-            if vg.get_code() == code:
-                return i, vg
-        return None
+        return self.__catalog.get(code)
 
     def add_videogame(self):
         """This method adds a videogame to the catalog of a type of machines."""
@@ -102,7 +103,7 @@ class Main:
             else:
                 break
         while True:
-            name = input("Insert the name of the videogame:\n").strip
+            name = input("Insert the name of the videogame:\n").strip()
             if not name:
                 print("Invalid input. name cannot be empty.")
             else:
@@ -147,7 +148,8 @@ class Main:
 
         videogame = VideoGame(code, name, description, storytelling_creator,
                 graphics_creator, category, price, year)
-        self.__catalog.append(videogame)
+        if not self.__catalog.add(videogame):  # added by another session meanwhile
+            print(f"The code {code} already exists, the videogame was not added.")
 
     def remove_videogame(self):
         """This method removes a videogame from the catalog.
@@ -157,9 +159,7 @@ class Main:
         """
         success = False
         code = int(input("Insert the code of the videogame:"))
-        response = self.__validate_videogame_code(code)
-        if response is not None:
-            self.__catalog.pop(response[0])
+        if self.__catalog.remove(code) is not None:
             success = True
 
         if success:
@@ -173,8 +173,8 @@ class Main:
         category = input("Please enter the category of the videogame you want to add:\n").strip()  # Ask for the category
         print(f"Looking for videogames in the category: {category}")
         
-        # Filter the catalog for videogames in the specified category
-        filtered_vg = [vg for vg in self.__catalog if vg.category.lower() == category.lower()]
+        # Look up the videogames of the specified category in the catalog index
+        filtered_vg = self.__catalog.by_category(category)
         
         if not filtered_vg:
             print("No videogames found in this category.")
@@ -187,7 +187,12 @@ class Main:
         code = int(input("Insert the code of the videogame you want to add:\n"))  # Ask for the videogame code
         response = self.__validate_videogame_code(code)
         
-        if response is not None and response in filtered_vg:  # Check if the videogame is in the filtered list
+        if self.__temp_machine.has_videogame(code):
+            print("The videogame is already in the machine.")
+            return
+
+        # Check if the videogame belongs to the specified category
+        if response is not None and normalize_category(response.get_category()) == normalize_category(category):
             print("Do you want it in high definition:\n")
             optionsDefinition = "1.Yes\n2.No"
             type_Definition = int(input(optionsDefinition))
@@ -196,24 +201,32 @@ class Main:
                 print("Invalid option. Please try again.")
                 type_Definition = int(input(optionsDefinition))
             
-            if type_Definition== 1:
-                response[1].highDefinition(True)
-            elif type_Definition == 2:
-                response[1].highDefinition(False)
-
-            self.__temp_machine.add_videogame(response[1])
+            # The choice is kept by the machine, the catalog price is not changed
+            self.__temp_machine.add_videogame(response.variant(type_Definition == 1))
             print("Videogame added successfully.")
         else:
             print("The videogame is not in the catalog or does not belong to the specified category.")
 
-    def show_videogames(self, category=None):
-        """This method shows all videogames in the catalog, or only those in the specified category."""
+    def show_videogames(self, category=None, price_range=None):
+        """This method shows all videogames in the catalog, or only those in the specified category.
+
+        Args:
+            category (str): Category of the videogames to show.
+            price_range (tuple): Optional (min, max) prices, used together with the category.
+        """
         if category:  # Check if a category has been provided
             print(f"Showing videogames in the category: {category}")
-            filtered_vg = [vg for vg in self.__catalog if vg.get_category.lower() == category.lower()]  # Filter by category
+            with self.__catalog.read():  # the games and the stats of the same catalog
+                if price_range:
+                    filtered_vg = self.__catalog.by_price_range(category, *price_range)  # Filter by category and price
+                else:
+                    filtered_vg = self.__catalog.by_category(category)  # Filter by category
+                stats = self.__catalog.stats(category)
             if not filtered_vg:  # If no games found in the category
                 print("No videogames found in this category.")
             else:
+                print(f"{stats['count']} videogames in the category, prices from ${stats['min_price']:.2f} "
+                      f"to ${stats['max_price']:.2f}, average ${stats['avg_price']:.2f}")
                 for vg in filtered_vg:
                     print(vg)
         else:  # If no category is provided, show all videogames
@@ -221,6 +234,27 @@ class Main:
             for vg in self.__catalog:
                 print(vg)
 
+    def search_videogames(self, query=None, k=10):
+        """This method shows the videogames that best match a text.
+
+        The text is looked up in the name, creators and description of
+        the videogames, and the last words may be incomplete.
+
+        Args:
+            query (str): Words to look for, asked to the user if not given.
+            k (int): Maximum number of videogames to show.
+        """
+        if query is None:
+            query = input("Enter the words to search for:\n").strip()
+        with self.__catalog.read():  # the index is changed with the catalog
+            results = self.__search.search(query, k)
+        if not results:
+            print("No videogames match your search.")
+            return
+        print(f"Best {len(results)} videogames for: {query}")
+        for vg, _ in results:
+            print(vg)
+
     def __get_delivery_information(self):
         """This method gets the delivery information."""
         print("Choose delivery address:")
@@ -230,10 +264,8 @@ class Main:
         temp_address = self.__user.get_addresses()[option - 1]
         delivery = Delivery(self.__user, temp_address, self.__temp_machine)
 
-        file_name = f"delivery_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}_\
-            {self.__user.get_id()}.pkl"
-        with open(file_name, "wb") as file:
-            pickle.dump(delivery, file)
+        self.__deliveries.append(delivery, self.__user.get_id())
+        self.__deliveries.commit()
 
         print("Delivery will be sent to:", self.__user.get_addresses()[option - 1])
 
@@ -297,20 +329,20 @@ class Main:
         MenuAddVG = "1.Add videogame to the machine\n2.Exit"
         optionAddVG = int(input(MenuAddVG))
         while optionAddVG!=2:
-            self.add_videogame_to_machine
+            self.add_videogame_to_machine()
             print("Please select the option you want:\n")
             optionAddVG = int(input(MenuAddVG))
 
-        price_videogames = sum(vg.get_price() for vg in self.__temp_machine.get_videogames())
-        total_price = self.__temp_machine.get_price() + price_videogames
+        total_price = self.__temp_machine.get_total_price()
         
         print("\nPurchased Machine Details:")
-        print(self.__temp_machine.__str__())
+        self.__temp_machine.write_to(sys.stdout)
+        print()
         print(f"\nTotal price: {total_price}")
 
         # Save the machine details to a file
         with open("registered_machines.txt", "a") as file:
-            file.write(f"{category.capitalize()}, {material.capitalize()}, {color.capitalize()}, ${total_price:.2f}\n")
+            file.write(format_machine_line(category, material, color, total_price))
         
         if isinstance(self.__user, Client):
             if self.__temp_machine is not None:
@@ -322,63 +354,50 @@ class Main:
             print("You do not have permission to buy a machine.")
         
     def show_registered_machines(self):
-        """This method shows all registered machines with search capabilities."""
+        """This method shows all registered machines with search capabilities.
+
+        Only the machines registered since the last call are read from the
+        file. Searches are written in the query language of machineQuery
+        and answered from the ledger indexes.
+        """
         try:
-            with open("registered_machines.txt", "r") as file:
-                lines = file.readlines()
-                
-                if not lines:
-                    print("No registered machines found.")
+            self.__ledger.refresh()
+            machines = self.__ledger.get_machines()
+
+            if not machines:
+                print("No registered machines found.")
+                return
+
+            # Ask user for search criteria
+            print("Would you like to search for specific machines? (yes/no)")
+            search_response = input().strip().lower()
+            if search_response == "yes":
+                print("Enter your search, for example:")
+                print("  category=dance material in (wood,aluminium) price 1000..5000 color~red order by price desc limit 20")
+                query = input().strip()
+                try:
+                    filtered_machines = search_machines(self.__ledger, query)
+                except ValueError as e:
+                    print(f"Invalid search. {e}")
                     return
-                
-                # Parse machines into a structured list of dictionaries
-                machines = []
-                for line in lines:
-                    parts = line.strip().split(", ")
-                    if len(parts) == 4:
-                        category, material, color, price = parts
-                        machines.append({
-                            "category": category,
-                            "material": material,
-                            "color": color,
-                            "price": float(price.replace("$", "").replace(",", ""))  # Convert price to float
-                        })
-
-                # Ask user for search criteria
-                print("Would you like to search for specific machines? (yes/no)")
-                search_response = input().strip().lower()
-                if search_response == "yes":
-                    # Gather search criteria
-                    price_range = input("Enter price range (min,max) or leave blank: ").strip()
-                    material_type = input("Enter material type or leave blank: ").strip()
-                    
-                    # Filter machines based on criteria
-                    filtered_machines = machines
-                    
-                    if price_range:
-                        min_price, max_price = map(float, price_range.split(","))
-                        filtered_machines = [m for m in filtered_machines if min_price <= m['price'] <= max_price]
-
-                    if material_type:
-                        filtered_machines = [m for m in filtered_machines if m['material'].lower() == material_type.lower()]
-
-
-                    # Display filtered results
-                    if filtered_machines:
-                        print("Filtered Registered Machines:")
-                        for machine in filtered_machines:
-                            print(f"{machine['category']}, {machine['material']}, {machine['color']}, ${machine['price']:.2f}")
-                    else:
-                        print("No machines match your search criteria.")
-                else:
-                    print("Displaying all registered machines:")
-                    for machine in machines:
+
+                # Display filtered results
+                if filtered_machines:
+                    print("Filtered Registered Machines:")
+                    for machine in filtered_machines:
                         print(f"{machine['category']}, {machine['material']}, {machine['color']}, ${machine['price']:.2f}")
+                else:
+                    print("No machines match your search criteria.")
+            else:
+                print("Displaying all registered machines:")
+                for machine in machines:
+                    print(f"{machine['category']}, {machine['material']}, {machine['color']}, ${machine['price']:.2f}")
 
         except FileNotFoundError:
             print("The file 'registered_machines.txt' does not exist.")
         except Exception as e:
             print(f"An error occurred: {e}")
+            error_log.log(f"ERROR. Registered machines could not be shown: {e}.")
 
 
     def show_menu(self):
@@ -408,7 +427,9 @@ class Main:
             self.show_registered_machines()
         elif option == 3:  # show videogames
             self.show_videogames()
-        elif option == 4:  # exit
+        elif option == 4:  # search videogames
+            self.search_videogames()
+        elif option == 5:  # exit
             print("Client view is closing!")
             exit_ = True
 
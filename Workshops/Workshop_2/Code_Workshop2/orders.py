@@ -0,0 +1,366 @@
+"""
+This module has classes to place machine orders without interactive prompts.
+
+A batch of orders is a JSONL file with one order per line, for example:
+
+    {"category": "dance", "material": "wood", "color": "red",
+     "games": [101, 102], "high_definition": [true, false], "address": 1}
+
+Run it from this folder to place a batch against the saved catalog, for
+the client described by a JSON file with the keys of the login of the
+server module:
+
+    python orders.py orders.jsonl --client client.json
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import json
+import argparse
+from time import perf_counter
+from machines import Machine
+from users import Client, Address
+from factoryMachines import PredefinedMachines, CATEGORIES, MATERIALS
+from catalog import Catalog, normalize_category
+from catalogStore import CatalogStore
+from ledger import format_machine_line
+from quoteCache import QuoteCache, quote_key
+from deliveryStore import Delivery, DeliveryStore
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
+
+error_log = get_log("log.txt")
+
+
+# pylint: disable=too-few-public-methods
+class OrderSpec:
+    """This class represents the choices a client makes when buying a machine."""
+
+    def __init__(self, category: str, material: str, color: str, games: list = (),
+                 high_definition: list = (), address: int = 1):
+        self.category = category
+        self.material = material
+        self.color = color
+        self.games = list(games)
+        self.high_definition = list(high_definition)
+        self.address = address
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OrderSpec":
+        """This method builds an order from a dictionary such as a JSONL line.
+
+        Args:
+            data (dict): Order with the keys category, material, color and
+                optionally games, high_definition and address.
+
+        Returns:
+            The OrderSpec described by the dictionary.
+
+        Raises:
+            ValueError: If the dictionary is not an order or a field has the wrong type.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("An order must be a JSON object")
+        for field in ("category", "material", "color"):
+            if not isinstance(data.get(field), str):
+                raise ValueError(f"The {field} of an order must be a text")
+        games = data.get("games", [])
+        high_definition = data.get("high_definition", [])
+        if not isinstance(games, list) or not all(isinstance(code, int) and not isinstance(code, bool)
+                                                  for code in games):
+            raise ValueError("The games of an order must be a list of integer codes")
+        if not isinstance(high_definition, list) or not all(isinstance(high, bool) for high in high_definition):
+            raise ValueError("The high_definition flags of an order must be a list of true or false")
+        address = data.get("address", 1)
+        if not isinstance(address, int) or isinstance(address, bool):
+            raise ValueError("The address of an order must be an integer")
+        return cls(data["category"], data["material"], data["color"], games, high_definition, address)
+
+    def get_selections(self) -> list:
+        """This method pairs every game code with its high definition flag.
+
+        Returns:
+            A list of (code, high_definition) tuples, missing flags are False.
+        """
+        flags = self.high_definition + [False] * (len(self.games) - len(self.high_definition))
+        return list(zip(self.games, flags))
+
+
+class OrderEngine:
+    """This class represents the order processing behind Main.buy_machine.
+
+    Machines are created with PredefinedMachines and priced as in the
+    interactive flow: the machine price plus the price of every game,
+    with the high definition surcharge where it was requested. Quotes
+    are remembered by configuration in a QuoteCache.
+    """
+
+    def __init__(self, catalog: Catalog, client: Client,
+                 ledger_path: str = "registered_machines.txt", deliveries: DeliveryStore = None,
+                 quote_cache_size: int = 1024):
+        self.__catalog = catalog
+        self.__client = client
+        self.__ledger_path = ledger_path
+        self.__deliveries = deliveries
+        self.__factory = PredefinedMachines()
+        self.__quotes = QuoteCache(catalog, quote_cache_size)
+        self.__quote_keys = {}
+        self.__quote_keys_size = quote_cache_size
+
+    def get_quote_cache(self) -> QuoteCache:
+        """This method returns the cache of the quotes of the engine.
+
+        Returns:
+            The QuoteCache.
+        """
+        return self.__quotes
+
+    @staticmethod
+    def __choices(spec: OrderSpec) -> tuple:
+        """Returns the normalized category, material and color of an order, or raises ValueError."""
+        for field in ("category", "material", "color"):
+            if not isinstance(getattr(spec, field), str):
+                raise ValueError(f"The {field} of an order must be a text")
+        category = normalize_category(spec.category)
+        material = spec.material.strip().lower()
+        color = spec.color.strip()
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown category: {spec.category}")
+        if material not in MATERIALS:
+            raise ValueError(f"Unknown material: {spec.material}")
+        if not color or any(not char.isalpha() and char not in [' ', '-', "'"] for char in color):
+            raise ValueError(f"Invalid color: {spec.color}")
+        return category, material, color
+
+    def build(self, spec: OrderSpec):
+        """This method creates and prices the machine of an order.
+
+        Args:
+            spec (OrderSpec): Order to be built.
+
+        Returns:
+            A tuple (machine, total_price).
+
+        Raises:
+            ValueError: If a choice of the order is not valid.
+        """
+        category, material, color = self.__choices(spec)
+        machine = self.__factory.create_machine(category, color, material)
+        for code, high in spec.get_selections():
+            videogame = self.__catalog.get(code)
+            if videogame is None:
+                raise ValueError(f"Videogame with code {code} is not in the catalog.")
+            if normalize_category(videogame.get_category()) != category:
+                raise ValueError(f"Videogame with code {code} does not belong to the category {category}.")
+            if machine.has_videogame(code):
+                raise ValueError(f"Videogame with code {code} is repeated in the order.")
+            machine.add_videogame(videogame.variant(high))
+
+        return machine, machine.get_total_price()
+
+    def quote(self, spec: OrderSpec) -> float:
+        """This method returns the price an order would have, without placing it.
+
+        A configuration quoted before is answered from the cache, else
+        its machine is built with the games sorted by code, so the quote
+        is the same for any order of the games. Invalid orders are never
+        cached. The choices of an order are validated once: the raw
+        choices are remembered with their quote key, so a repeated order
+        is answered with a dictionary lookup.
+
+        Args:
+            spec (OrderSpec): Order to be quoted.
+
+        Returns:
+            The total price of the order.
+
+        Raises:
+            ValueError: If a choice of the order is not valid.
+        """
+        raw = (spec.category, spec.material, spec.color, tuple(spec.games), tuple(spec.high_definition))
+        try:
+            key = self.__quote_keys.get(raw)
+        except TypeError:
+            key = raw = None
+        if key is not None:
+            price = self.__quotes.get(key)
+            if price is not None:
+                return price
+
+        category, material, color = self.__choices(spec)
+        key = quote_key(category, material, spec.games, spec.high_definition)
+        price = self.__quotes.get(key)
+        if price is None:
+            codes = [code for code, _ in key[2]]
+            flags = [high for _, high in key[2]]
+            _, price = self.build(OrderSpec(category, material, color, codes, flags))
+            self.__quotes.put(key, price)
+        if raw is not None:
+            if len(self.__quote_keys) >= self.__quote_keys_size:
+                self.__quote_keys.clear()
+            self.__quote_keys[raw] = key
+        return price
+
+    def __deliver(self, spec: OrderSpec, machine: Machine):
+        if self.__deliveries is None:
+            return
+        addresses = self.__client.get_addresses()
+        if not 1 <= spec.address <= len(addresses):
+            raise ValueError(f"Invalid address option: {spec.address}")
+        delivery = Delivery(self.__client, addresses[spec.address - 1], machine)
+        self.__deliveries.append(delivery, self.__client.get_id())
+
+    def place(self, spec: OrderSpec) -> float:
+        """This method places one order, registering and delivering its machine.
+
+        Args:
+            spec (OrderSpec): Order to be placed.
+
+        Returns:
+            The total price of the order.
+
+        Raises:
+            ValueError: If a choice of the order is not valid.
+        """
+        machine, total_price = self.build(spec)
+        self.__deliver(spec, machine)
+        with open(self.__ledger_path, "a", encoding="utf-8") as file:
+            file.write(format_machine_line(spec.category.strip(), spec.material.strip(),
+                                           spec.color.strip(), total_price))
+        if self.__deliveries is not None:
+            self.__deliveries.commit()
+        return total_price
+
+    def place_many(self, specs) -> dict:
+        """This method places a batch of orders.
+
+        The ledger lines are written with a single append and the
+        deliveries with group commits. Invalid orders are skipped and
+        reported.
+
+        Args:
+            specs: Iterable of OrderSpec.
+
+        Returns:
+            A dictionary with the number of orders placed and failed, the
+            failures as (position, message) tuples, the revenue, the
+            elapsed seconds and the orders per second.
+        """
+        start = perf_counter()
+        lines = []
+        failures = []
+        revenue = 0
+        for position, spec in enumerate(specs, start=1):
+            try:
+                machine, total_price = self.build(spec)
+                self.__deliver(spec, machine)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                failures.append((position, str(e)))
+                error_log.log(f"ERROR. Order {position} was not placed: {e}.")
+                continue
+            lines.append(format_machine_line(spec.category.strip(), spec.material.strip(),
+                                             spec.color.strip(), total_price))
+            revenue += total_price
+
+        with open(self.__ledger_path, "a", encoding="utf-8") as file:
+            file.write("".join(lines))
+        if self.__deliveries is not None:
+            self.__deliveries.commit()
+
+        seconds = perf_counter() - start
+        return {
+            "placed": len(lines),
+            "failed": len(failures),
+            "failures": failures,
+            "revenue": revenue,
+            "seconds": seconds,
+            "orders_per_second": len(lines) / seconds if seconds else float("inf"),
+        }
+
+    def process_file(self, path: str) -> dict:
+        """This method places every order of a JSONL file.
+
+        Args:
+            path (str): Path of the file, one JSON order per line.
+
+        Returns:
+            The report of place_many, with failures identified by line
+            number and lines that are not valid orders reported too.
+        """
+        specs = []
+        numbers = []
+        bad_lines = []
+        with open(path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    specs.append(OrderSpec.from_dict(json.loads(line)))
+                    numbers.append(number)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    bad_lines.append((number, str(e)))
+                    error_log.log(f"ERROR. Line {number} of {path} is not a valid order: {e}.")
+
+        report = self.place_many(specs)
+        failures = bad_lines + [(numbers[position - 1], message) for position, message in report["failures"]]
+        report["failed"] = len(failures)
+        report["failures"] = sorted(failures)
+        return report
+
+
+def _load_client(path: str) -> Client:
+    """Builds the client described by a JSON file, with the checks of the login of the server."""
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    address = data["address"]
+    country = str(address["country"]).strip()
+    if not country or any(not char.isalpha() and char not in [' ', '-', "'"] for char in country):
+        raise ValueError(f"Invalid country: {address['country']}")
+    return Client(int(data["id"]), data["name"], data["email"], data["phone"],
+                  Address(address["street"], int(address["zip_code"]), address["city"], country))
+
+
+def main():
+    """This function places the orders of a JSONL file and prints the report."""
+    parser = argparse.ArgumentParser(description="Place every order of a JSONL file.")
+    parser.add_argument("path")
+    parser.add_argument("--client", required=True, help="JSON file with the client that places the orders")
+    arguments = parser.parse_args()
+
+    try:
+        client = _load_client(arguments.client)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        parser.error(f"The client could not be read: {e}")
+    catalog_store = CatalogStore("catalog")
+    catalog = catalog_store.load()
+    try:
+        with DeliveryStore("deliveries") as deliveries:
+            report = OrderEngine(catalog, client, "registered_machines.txt", deliveries).process_file(arguments.path)
+    finally:
+        catalog_store.close()
+    for number, message in report["failures"]:
+        print(f"Line {number}: {message}")
+    print(f"{report['placed']} orders placed, {report['failed']} failed, "
+          f"revenue ${report['revenue']:.2f}, {report['orders_per_second']:.0f} orders/s")
+
+
+if __name__ == "__main__":
+    main()
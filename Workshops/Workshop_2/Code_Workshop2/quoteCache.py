@@ -0,0 +1,171 @@
+"""
+This module has a class to remember the price quotes of machine configurations.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+from itertools import chain, repeat
+from videogames import VideoGame
+from catalog import Catalog
+
+
+def quote_key(category: str, material: str, games, high_definition=()) -> tuple:
+    """This function returns the canonical configuration of a machine to be quoted.
+
+    The price of a machine only depends on its category, which gives its
+    base price and its accessories, such as the controls of the dance
+    machines or the glasses of the virtual reality machines, its material
+    and the games installed with their high definition flags, so the
+    color is not part of it.
+
+    Args:
+        category (str): Normalized category of the machine.
+        material (str): Normalized material of the machine.
+        games: Codes of the videogames.
+        high_definition: High definition flag of every game, missing flags are False.
+
+    Returns:
+        A hashable tuple with the (code, high_definition) pairs sorted,
+        the same for any order of the games.
+
+    Raises:
+        ValueError: If a code is not an integer.
+    """
+    games = list(games)
+    for code in games:
+        if not isinstance(code, int) or isinstance(code, bool):
+            raise ValueError(f"Invalid videogame code: {code!r}")
+    flags = map(bool, chain(high_definition, repeat(False)))
+    return (category, material, tuple(sorted(zip(games, flags))))
+
+
+class QuoteCache:
+    """This class represents the most recently used price quotes.
+
+    Quotes are kept by the key returned by quote_key, from the least to
+    the most recently used, and the least recently used one is dropped
+    when the cache is full. The cache is a journal of the catalog: when
+    a videogame changes or is removed, the quotes that include it are
+    dropped, so a quote is never older than the prices of its games.
+    """
+
+    def __init__(self, catalog: Catalog, max_size: int = 1024):
+        """Initializes an empty cache that follows the changes of a catalog.
+
+        Args:
+            catalog (Catalog): Catalog whose prices the quotes depend on.
+            max_size (int): Maximum number of quotes kept.
+        """
+        self.__max_size = max_size
+        self.__quotes = OrderedDict()
+        self.__keys_by_code = {}
+        self.__hits = 0
+        self.__misses = 0
+        catalog.add_journal(self)
+
+    def get(self, key: tuple):
+        """This method returns a cached quote and marks it as recently used.
+
+        Args:
+            key (tuple): Configuration returned by quote_key.
+
+        Returns:
+            The quoted price, or None if the configuration is not cached.
+        """
+        price = self.__quotes.get(key)
+        if price is None:
+            self.__misses += 1
+            return None
+        self.__quotes.move_to_end(key)
+        self.__hits += 1
+        return price
+
+    def put(self, key: tuple, price: float):
+        """This method stores a quote, dropping the least recently used one if the cache is full.
+
+        Args:
+            key (tuple): Configuration returned by quote_key.
+            price (float): Quoted price of the configuration.
+        """
+        if key in self.__quotes:
+            self.__quotes.move_to_end(key)
+        elif len(self.__quotes) >= self.__max_size:
+            self.__discard(next(iter(self.__quotes)))
+        self.__quotes[key] = price
+        for code, _ in key[2]:
+            self.__keys_by_code.setdefault(code, set()).add(key)
+
+    def __discard(self, key: tuple):
+        del self.__quotes[key]
+        for code, _ in key[2]:
+            keys = self.__keys_by_code.get(code)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__keys_by_code[code]
+
+    def invalidate(self, code: int) -> int:
+        """This method drops the quotes that include a videogame.
+
+        Args:
+            code (int): Code of the videogame.
+
+        Returns:
+            The number of quotes dropped.
+        """
+        keys = self.__keys_by_code.pop(code, ())
+        for key in keys:
+            if key in self.__quotes:
+                self.__discard(key)
+        return len(keys)
+
+    def clear(self):
+        """This method drops every quote, the counters are kept."""
+        self.__quotes.clear()
+        self.__keys_by_code.clear()
+
+    def added(self, videogame: VideoGame):
+        """This method does nothing, no cached quote includes a new videogame."""
+
+    def removed(self, videogame: VideoGame):
+        """This method drops the quotes of a videogame removed from the catalog."""
+        self.invalidate(videogame.get_code())
+
+    def changed(self, videogame: VideoGame):
+        """This method drops the quotes of a videogame whose price may have changed."""
+        self.invalidate(videogame.get_code())
+
+    def get_hits(self) -> int:
+        """This method returns the number of lookups answered by the cache.
+
+        Returns:
+            An integer with the number of hits.
+        """
+        return self.__hits
+
+    def get_misses(self) -> int:
+        """This method returns the number of lookups the cache could not answer.
+
+        Returns:
+            An integer with the number of misses.
+        """
+        return self.__misses
+
+    def __len__(self) -> int:
+        return len(self.__quotes)
@@ -0,0 +1,167 @@
+"""
+This module has a class to search the videogames of the catalog by text.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+import math
+import heapq
+from bisect import bisect_left, insort
+from videogames import VideoGame
+from catalog import Catalog
+
+TOKEN = re.compile(r"\w+")
+
+# Weight of a token by the field it appears in
+FIELD_WEIGHTS = (
+    (VideoGame.get_name, 3.0),
+    (VideoGame.get_storytelling_creator, 2.0),
+    (VideoGame.get_graphics_creator, 2.0),
+    (VideoGame.get_description, 1.0),
+)
+
+
+def tokenize(text: str) -> list:
+    """This function splits a text into lower case words.
+
+    Args:
+        text (str): Text to split.
+
+    Returns:
+        A list with the words of the text.
+    """
+    return TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """This class represents an inverted index over the text of the catalog.
+
+    Every token of the name, creators and description of a videogame
+    points to the codes of the videogames that contain it, with a weight
+    that favours the name over the creators and the creators over the
+    description. The tokens are also kept sorted, so the videogames of
+    every token starting with a prefix are found by bisection. The index
+    is a journal of the catalog, so it follows every add, removal and
+    change.
+
+    A search only visits the videogames that contain the query terms and
+    keeps the best k of them in a heap.
+    """
+
+    def __init__(self, catalog: Catalog, max_expansions: int = 64):
+        """Builds the index of the videogames of a catalog and starts following it.
+
+        Args:
+            catalog (Catalog): Catalog to index.
+            max_expansions (int): Maximum number of tokens a prefix is expanded to.
+        """
+        self.__catalog = catalog
+        self.__max_expansions = max_expansions
+        self.__postings = {}   # token -> {code: weight}
+        self.__documents = {}  # code -> {token: weight}
+        for videogame in catalog:
+            self.__index(videogame)
+        self.__tokens = sorted(self.__postings)
+        catalog.add_journal(self)
+
+    def __index(self, videogame: VideoGame) -> list:
+        """Adds a videogame to the postings and returns the tokens that are new."""
+        weights = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(field(videogame)):
+                weights[token] = weights.get(token, 0.0) + weight
+        code = videogame.get_code()
+        self.__documents[code] = weights
+        new_tokens = []
+        for token, weight in weights.items():
+            posting = self.__postings.get(token)
+            if posting is None:
+                posting = self.__postings[token] = {}
+                new_tokens.append(token)
+            posting[code] = weight
+        return new_tokens
+
+    def __unindex(self, code: int):
+        for token in self.__documents.pop(code, {}):
+            posting = self.__postings[token]
+            del posting[code]
+            if not posting:
+                del self.__postings[token]
+                self.__tokens.pop(bisect_left(self.__tokens, token))
+
+    def added(self, videogame: VideoGame):
+        """This method indexes a videogame added to the catalog."""
+        for token in self.__index(videogame):
+            insort(self.__tokens, token)
+
+    def removed(self, videogame: VideoGame):
+        """This method removes a videogame from the index."""
+        self.__unindex(videogame.get_code())
+
+    def changed(self, videogame: VideoGame):
+        """This method indexes again a videogame whose description may have changed."""
+        self.__unindex(videogame.get_code())
+        self.added(videogame)
+
+    def __expand(self, term: str) -> list:
+        """Returns the token equal to the term, or else the tokens that start with it."""
+        if term in self.__postings:
+            return [term]
+        start = bisect_left(self.__tokens, term)
+        expansions = []
+        for token in self.__tokens[start:start + self.__max_expansions]:
+            if not token.startswith(term):
+                break
+            expansions.append(token)
+        return expansions
+
+    def search(self, query: str, k: int = 10) -> list:
+        """This method returns the videogames that best match a query.
+
+        Every term of the query matches the token equal to it or, if
+        there is none, the tokens that start with it. A videogame scores,
+        for every term, the weight of its best matching token times how
+        rare that token is, so videogames matching more and rarer terms
+        come first.
+
+        Args:
+            query (str): Words to look for.
+            k (int): Maximum number of videogames to return.
+
+        Returns:
+            A list of (VideoGame, score) tuples, best first.
+        """
+        total = len(self.__documents)
+        scores = {}
+        for term in set(tokenize(query)):
+            best = {}
+            for token in self.__expand(term):
+                posting = self.__postings[token]
+                rarity = math.log(1 + total / len(posting))
+                for code, weight in posting.items():
+                    score = weight * rarity
+                    if score > best.get(code, 0.0):
+                        best[code] = score
+            for code, score in best.items():
+                scores[code] = scores.get(code, 0.0) + score
+        top = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.__catalog.get(code), score) for code, score in top]
+
+    def __len__(self) -> int:
+        return len(self.__tokens)
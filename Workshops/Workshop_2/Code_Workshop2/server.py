@@ -0,0 +1,400 @@
+"""
+This module has a server to sell machines to many terminals at once.
+
+Terminals connect over TCP or a Unix socket and exchange one JSON
+object per line. Every request has an "action" and every response has
+"ok", plus the result or an "error" message, for example:
+
+    {"action": "login", "client": {"id": 1, "name": "Ana", "email": "ana@example.com",
+     "phone": "3001234567", "address": {"street": "Street 1", "zip_code": 110111,
+     "city": "Bogota", "country": "Colombia"}}}
+    {"action": "browse", "category": "dance", "min_price": 10, "max_price": 50, "limit": 20}
+    {"action": "search", "query": "dance rev", "k": 10}
+    {"action": "start", "category": "dance", "material": "wood", "color": "red"}
+    {"action": "add", "code": 101, "high_definition": true}
+    {"action": "remove", "code": 101}
+    {"action": "quote"}
+    {"action": "buy", "address": 1}
+    {"action": "machines", "query": "category=dance price 1000..5000 order by price desc limit 20"}
+    {"action": "quit"}
+
+A quote may also be asked for a whole order without a session machine,
+with the keys of an order line of the orders module.
+
+Run it from this folder:
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--unix PATH]
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshop2-SM.
+
+Workshop2-SM is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshop2-SM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import json
+import pickle
+import asyncio
+import argparse
+from datetime import datetime
+from videogames import VideoGame
+from users import Client, Address
+from catalog import Catalog
+from catalogStore import CatalogStore
+from search import SearchIndex
+from ledger import MachineLedger, format_machine_line
+from machineQuery import search_machines
+from deliveryStore import Delivery, DeliveryStore
+from orders import OrderEngine, OrderSpec
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))
+from async_log import get_log  # pylint: disable=wrong-import-position
+
+error_log = get_log("log.txt")
+
+
+def videogame_to_dict(videogame: VideoGame) -> dict:
+    """This function returns the fields of a videogame that terminals show.
+
+    Args:
+        videogame (VideoGame): Videogame to describe.
+
+    Returns:
+        A dictionary that can be written as JSON.
+    """
+    return {
+        "code": videogame.get_code(),
+        "name": videogame.get_name(),
+        "description": videogame.get_description(),
+        "category": videogame.get_category(),
+        "price": videogame.get_price(),
+        "high_definition_price": videogame.get_high_definition_price(),
+        "year": videogame.get_year(),
+    }
+
+
+# pylint: disable=too-few-public-methods
+class Session:
+    """This class represents the state of one connected terminal.
+
+    It replaces the single user and machine that Main keeps: the client
+    logged in and the order being put together, which is only turned
+    into a machine when it is quoted or bought.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.order = None
+
+
+class SalesServer:
+    """This class represents the sales server shared by every terminal.
+
+    Requests are answered on the event loop, so the catalog and the
+    search index are only used by one request at a time and need no
+    locks. The ledger of registered machines is read from disk in a
+    worker thread, behind an asyncio lock so one request at a time reads
+    and queries it. Purchases are written in another worker thread, the
+    only one that touches the ledger file and the delivery store, in
+    groups of every purchase made while the previous group was written.
+    Each group is one append and one fsync of the ledger, then one write
+    and one fsync of the deliveries, so a slow disk delays the buyers but
+    never the other terminals.
+    """
+
+    def __init__(self, catalog: Catalog, ledger_path: str = "registered_machines.txt",
+                 deliveries: DeliveryStore = None, search: SearchIndex = None):
+        """Initializes the server.
+
+        Args:
+            catalog (Catalog): Catalog offered to the terminals.
+            ledger_path (str): Path of the registered machines file.
+            deliveries (DeliveryStore): Store of the deliveries of the purchases.
+            search (SearchIndex): Index of the catalog, built if not given.
+        """
+        self.__catalog = catalog
+        self.__search = search if search is not None else SearchIndex(catalog)
+        self.__ledger_path = ledger_path
+        self.__ledger = MachineLedger(ledger_path)
+        self.__ledger_lock = asyncio.Lock()
+        self.__deliveries = deliveries
+        self.__engine = OrderEngine(catalog, None, ledger_path)
+        self.__purchases = None
+        self.__writer = None
+        self.__sessions = 0
+        self.__actions = {
+            "login": self.__login,
+            "browse": self.__browse,
+            "search": self.__search_videogames,
+            "start": self.__start,
+            "add": self.__add,
+            "remove": self.__remove,
+            "quote": self.__quote,
+            "buy": self.__buy,
+            "machines": self.__machines,
+        }
+
+    def get_sessions(self) -> int:
+        """This method returns the number of connected terminals.
+
+        Returns:
+            An integer with the number of open sessions.
+        """
+        return self.__sessions
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, path: str = None) -> asyncio.AbstractServer:
+        """This method starts accepting terminals.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): TCP port to listen on, 0 for any free port.
+            path (str): Path of a Unix socket to listen on instead of TCP.
+
+        Returns:
+            The asyncio server, already serving.
+        """
+        self.__purchases = asyncio.Queue()
+        self.__writer = asyncio.create_task(self.__write_purchases())
+        if path is not None:
+            return await asyncio.start_unix_server(self.__serve_terminal, path)
+        return await asyncio.start_server(self.__serve_terminal, host, port)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, path: str = None):
+        """This method serves terminals until it is cancelled.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): TCP port to listen on.
+            path (str): Path of a Unix socket to listen on instead of TCP.
+        """
+        server = await self.start(host, port, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """This method waits for the purchases being written and stops the writer."""
+        if self.__writer is None:
+            return
+        await self.__purchases.join()
+        self.__writer.cancel()
+        self.__writer = None
+        if self.__deliveries is not None:
+            await asyncio.to_thread(self.__deliveries.commit)
+
+    async def __serve_terminal(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = Session()
+        self.__sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # the line is longer than the stream limit
+                    writer.write(b'{"ok": false, "error": "The request is too long"}\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle(session, line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+                if response.get("bye"):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.__sessions -= 1
+            writer.close()
+
+    async def handle(self, session: Session, line: bytes) -> dict:
+        """This method answers one request of a terminal.
+
+        Args:
+            session (Session): State of the terminal.
+            line (bytes): The request, a JSON object.
+
+        Returns:
+            The response as a dictionary.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("The request must be a JSON object")
+            action = request.get("action")
+            if action == "quit":
+                return {"ok": True, "bye": True}
+            if action not in self.__actions:
+                raise ValueError(f"Unknown action: {action}")
+            result = self.__actions[action](session, request)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return {"ok": True, **result}
+        except (ValueError, KeyError, TypeError) as e:
+            return {"ok": False, "error": str(e) if not isinstance(e, KeyError) else f"Missing {e}"}
+        except Exception as e:  # pylint: disable=broad-except
+            error_log.log(f"ERROR. Request {line[:200]!r} failed: {e}.")
+            return {"ok": False, "error": "The request could not be answered"}
+
+    # ========== Actions ========== #
+    def __login(self, session: Session, request: dict) -> dict:
+        data = request["client"]
+        address = data["address"]
+        country = str(address["country"]).strip()
+        if not country or any(not char.isalpha() and char not in [' ', '-', "'"] for char in country):
+            raise ValueError(f"Invalid country: {address['country']}")
+        session.client = Client(int(data["id"]), data["name"], data["email"], data["phone"],
+                                Address(address["street"], int(address["zip_code"]), address["city"], country))
+        return {"client": session.client.get_id()}
+
+    def __browse(self, _session: Session, request: dict) -> dict:
+        limit = int(request.get("limit", 50))
+        category = request.get("category")
+        if category is None:
+            videogames = self.__catalog.cheapest(None, limit)
+        elif "min_price" in request or "max_price" in request:
+            videogames = self.__catalog.by_price_range(category, float(request.get("min_price", 0)),
+                                                       float(request.get("max_price", float("inf"))))
+        else:
+            videogames = self.__catalog.by_category(category)
+        return {"videogames": [videogame_to_dict(videogame) for videogame in videogames[:limit]],
+                "stats": self.__catalog.stats(category)}
+
+    def __search_videogames(self, _session: Session, request: dict) -> dict:
+        results = self.__search.search(str(request["query"]), int(request.get("k", 10)))
+        return {"videogames": [dict(videogame_to_dict(videogame), score=score) for videogame, score in results]}
+
+    def __start(self, session: Session, request: dict) -> dict:
+        order = OrderSpec(request["category"], request["material"], request["color"])
+        price = self.__engine.quote(order)
+        session.order = order
+        return {"total_price": price}
+
+    def __session_order(self, session: Session) -> OrderSpec:
+        if session.order is None:
+            raise ValueError("Start a machine first")
+        return session.order
+
+    def __add(self, session: Session, request: dict) -> dict:
+        order = self.__session_order(session)
+        games = order.get_selections() + [(int(request["code"]), bool(request.get("high_definition", False)))]
+        changed = OrderSpec(order.category, order.material, order.color,
+                            [code for code, _ in games], [high for _, high in games])
+        price = self.__engine.quote(changed)  # rejects codes not in the category or repeated
+        session.order = changed
+        return {"total_price": price}
+
+    def __remove(self, session: Session, request: dict) -> dict:
+        order = self.__session_order(session)
+        code = int(request["code"])
+        games = [(game, high) for game, high in order.get_selections() if game != code]
+        if len(games) == len(order.games):
+            raise ValueError(f"VideoGame with code {code} is not in the machine.")
+        session.order = OrderSpec(order.category, order.material, order.color,
+                                  [game for game, _ in games], [high for _, high in games])
+        return {"total_price": self.__engine.quote(session.order)}
+
+    def __quote(self, session: Session, request: dict) -> dict:
+        if "category" in request:
+            return {"total_price": self.__engine.quote(OrderSpec.from_dict(request))}
+        return {"total_price": self.__engine.quote(self.__session_order(session))}
+
+    async def __buy(self, session: Session, request: dict) -> dict:
+        if session.client is None:
+            raise ValueError("You must log in as a client to buy a machine")
+        order = self.__session_order(session)
+        addresses = session.client.get_addresses()
+        option = int(request.get("address", 1))
+        if not 1 <= option <= len(addresses):
+            raise ValueError(f"Invalid address option: {option}")
+        machine, total_price = self.__engine.build(order)
+        line = format_machine_line(order.category.strip(), order.material.strip(), order.color.strip(), total_price)
+        payload = None
+        if self.__deliveries is not None:
+            payload = pickle.dumps(Delivery(session.client, addresses[option - 1], machine))
+        done = asyncio.get_running_loop().create_future()
+        await self.__purchases.put((line, payload, session.client.get_id(), int(datetime.now().timestamp()), done))
+        await done
+        session.order = None
+        return {"total_price": total_price}
+
+    async def __machines(self, _session: Session, request: dict) -> dict:
+        query = str(request.get("query", "")).strip()
+        limit = int(request.get("limit", 1000))
+        async with self.__ledger_lock:
+            try:
+                await asyncio.to_thread(self.__ledger.refresh)
+            except FileNotFoundError:
+                return {"machines": []}
+            machines = search_machines(self.__ledger, query) if query else self.__ledger.get_machines()
+        return {"machines": machines[:limit]}
+
+    # ========== Purchases ========== #
+    async def __write_purchases(self):
+        """Writes the purchases waiting in the queue, a group at a time."""
+        while True:
+            group = [await self.__purchases.get()]
+            while not self.__purchases.empty():
+                group.append(self.__purchases.get_nowait())
+            try:
+                await asyncio.to_thread(self.__write_group, group)
+            except Exception as e:  # pylint: disable=broad-except
+                error_log.log(f"ERROR. {len(group)} purchases could not be written: {e}.")
+                for *_, done in group:
+                    done.set_exception(OSError("The purchase could not be saved"))
+            else:
+                for *_, done in group:
+                    done.set_result(None)
+            finally:
+                for _ in group:
+                    self.__purchases.task_done()
+
+    def __write_group(self, group: list):
+        with open(self.__ledger_path, "a", encoding="utf-8") as file:
+            file.write("".join(line for line, *_ in group))
+            file.flush()
+            os.fsync(file.fileno())
+        if self.__deliveries is not None:
+            for _, payload, client_id, timestamp, _ in group:
+                self.__deliveries.append_raw(payload, client_id, timestamp)
+            self.__deliveries.commit()
+
+
+def main():
+    """This function serves the catalog and ledgers of this folder."""
+    parser = argparse.ArgumentParser(description="Serve the machine sales to many terminals.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to listen on instead of TCP")
+    arguments = parser.parse_args()
+
+    catalog_store = CatalogStore("catalog")
+    catalog = catalog_store.load()
+    deliveries = DeliveryStore("deliveries")
+    server = SalesServer(catalog, "registered_machines.txt", deliveries)
+    try:
+        asyncio.run(server.serve(arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        deliveries.close()
+        catalog_store.close()
+
+
+if __name__ == "__main__":
+    main()
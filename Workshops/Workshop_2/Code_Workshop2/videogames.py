@@ -19,8 +19,49 @@ You should have received a copy of the GNU General Public License
 along with Workshop2-SM. If not, see <https://www.gnu.org/licenses/>. 
 """
 
+from weakref import ref
+
+HIGH_DEFINITION_SURCHARGE = 0.1
+RULE = "=" * 10  # first and last line of the description of a videogame
+# Attributes of a VideoGame pickled by versions without __slots__, in __getstate__ order
+LEGACY_FIELDS = ("code", "name", "description", "storytelling_creator", "graphics_creator",
+                 "category", "price", "year")
+
+
+def _with_high_definition_price(text: str, price: float) -> str:
+    """Adds the high definition price of a videogame before the closing rule of its description."""
+    return f"{text[:-len(RULE)]}High Definition Price: ${high_definition_price(price):.2f}\n{RULE}"
+
+
+def high_definition_price(price: float) -> float:
+    """This function returns a price plus the high definition surcharge.
+
+    Args:
+        price (float): Price of a videogame.
+
+    Returns:
+        A float with the price in high definition.
+    """
+    return price+(price*HIGH_DEFINITION_SURCHARGE)
+
+
 class VideoGame:
-    """This class represents the behavior of a general videogame."""
+    """This class represents the behavior of a general videogame.
+
+    The attributes are declared in __slots__, so instances carry no
+    per-instance __dict__, which keeps large catalogs compact. The
+    string representation is cached until the price or description change.
+    The shared variants and the watchers are kept in a single list,
+    variants first, only allocated when the videogame is installed or
+    watched.
+
+    A videogame is shared by the catalog and every machine that has it,
+    the choice of high definition is kept by the GameVariant returned by
+    variant, so it never changes the price of the shared videogame.
+    """
+
+    __slots__ = ("__code", "__name", "__description", "__storytelling_creator",
+                 "__graphics_creator", "__category", "__price", "__year", "__text", "__links")
 
     def __init__(self, code: int, name: str, description: str, storytelling_creator: str,
                  graphics_creator: str, category: str, price: float, year: int):
@@ -32,6 +73,8 @@ class VideoGame:
         self.__category = category
         self.__price = price
         self.__year = year
+        self.__text = None
+        self.__links = None
 
     def get_code(self) -> int:
         """This method returns the code of the videogame.
@@ -41,6 +84,46 @@ class VideoGame:
         """
         return self.__code
     
+    def get_name(self) -> str:
+        """This method returns the name of the videogame.
+
+        Returns:
+            A string with the name of the videogame.
+        """
+        return self.__name
+
+    def get_description(self) -> str:
+        """This method returns the description of the videogame.
+
+        Returns:
+            A string with the description of the videogame.
+        """
+        return self.__description
+
+    def get_storytelling_creator(self) -> str:
+        """This method returns the storytelling creator of the videogame.
+
+        Returns:
+            A string with the storytelling creator of the videogame.
+        """
+        return self.__storytelling_creator
+
+    def get_graphics_creator(self) -> str:
+        """This method returns the graphics creator of the videogame.
+
+        Returns:
+            A string with the graphics creator of the videogame.
+        """
+        return self.__graphics_creator
+
+    def get_year(self) -> int:
+        """This method returns the year of the videogame.
+
+        Returns:
+            An integer with the year of the videogame.
+        """
+        return self.__year
+
     def get_category(self) -> str:
         """This method returns the category of the videogame.
         
@@ -57,37 +140,159 @@ class VideoGame:
         """
         return self.__price
 
-    def set_description(self, description: str):
-        """This method changes the description of the videogame.
-        
+    def get_high_definition_price(self) -> float:
+        """This method returns the price of the videogame in high definition.
+
+        Returns:
+            A float with the price plus the high definition surcharge.
+        """
+        return high_definition_price(self.__price)
+
+    def variant(self, high_definition: bool = False) -> "GameVariant":
+        """This method returns the videogame as installed in a machine.
+
+        There are only two variants of a videogame, with and without
+        high definition, created on first use and shared by every
+        machine that installs it.
+
         Args:
-            description (str): New description of the videogame.
+            high_definition (bool): True if the videogame is wanted in high definition.
+
+        Returns:
+            The shared GameVariant.
         """
-        self.__description = description
+        if self.__links is None:
+            self.__links = [None]
+        if self.__links[0] is None:
+            self.__links[0] = (GameVariant(self, False), GameVariant(self, True))
+        return self.__links[0][bool(high_definition)]
 
     def set_description(self, description: str):
         """This method changes the description of the videogame.
+
+        The watchers are notified, with the price unchanged, so the
+        summaries they cached are rendered again.
         
         Args:
             description (str): New description of the videogame.
         """
         self.__description = description
+        self.__text = None
+        self.__notify(self.__price)
+
+    def add_watcher(self, watcher):
+        """This method registers an object to be notified of price changes.
+
+        The watcher must provide a price_changed(videogame, old_price)
+        method, it is used by catalogs and machines to keep their
+        indexes and totals up to date. Watchers are held by weak
+        reference, so watching a videogame does not keep a machine alive.
+        The references have no callback, so Python shares a single one
+        among all the videogames watched by the same object. The
+        references to collected watchers are dropped whenever the list
+        doubles in size, so registering stays O(1) amortized.
+
+        Args:
+            watcher: Object to be notified.
+        """
+        if self.__links is None:
+            self.__links = [None, ref(watcher)]
+        else:
+            watchers = len(self.__links) - 1
+            if watchers and watchers & (watchers - 1) == 0:
+                self.__links[1:] = [registered for registered in self.__links[1:] if registered() is not None]
+            self.__links.append(ref(watcher))
+
+    @staticmethod
+    def add_watcher_to_all(videogames, watcher):
+        """This method registers an object to be notified of the price changes of many videogames.
+
+        It is the same as calling add_watcher on each videogame, but
+        the videogames that have no watchers yet share a single new
+        reference, which makes loading large catalogs faster.
+
+        Args:
+            videogames: Iterable of VideoGame.
+            watcher: Object to be notified.
+        """
+        registered = ref(watcher)
+        for videogame in videogames:
+            if videogame.__links is None:
+                videogame.__links = [None, registered]
+            else:
+                videogame.add_watcher(watcher)
+
+    def remove_watcher(self, watcher):
+        """This method stops notifying an object of price changes.
+
+        Args:
+            watcher: Object previously registered with add_watcher.
+        """
+        links = self.__links or ()
+        for i in range(1, len(links)):
+            if links[i]() is watcher:
+                del links[i]
+                break
 
     def highDefinition(self, high:bool):
         """This method changes the price of the videogame if it is in high definition.
+
+        The change is seen by the catalog and every machine holding this
+        videogame, use variant(True) to install it in high definition
+        in a single machine.
         
         Args:
-            description (str): New description of the videogame.
+            high (bool): True if the videogame is wanted in high definition.
         """
         if high==True:
-            self.__price = self.__price+(self.__price*0.1)
+            old_price = self.__price
+            self.__price = self.get_high_definition_price()
+            self.__text = None
+            self.__notify(old_price)
         else:
             pass
 
+    def __notify(self, old_price: float):
+        for registered in (self.__links or [None])[1:]:
+            watcher = registered()
+            if watcher is not None:
+                watcher.price_changed(self, old_price)
+
+    def __getstate__(self) -> tuple:
+        """Returns the state to be pickled, watchers are not part of it."""
+        return (self.__code, self.__name, self.__description, self.__storytelling_creator,
+                self.__graphics_creator, self.__category, self.__price, self.__year)
+
+    def __setstate__(self, state):
+        """Restores the state returned by __getstate__.
+
+        Older versions had no __slots__ and were pickled with their
+        attribute dictionary, whose values are taken in field order.
+        """
+        if isinstance(state, dict):
+            state = tuple(state[f"_VideoGame__{field}"] for field in LEGACY_FIELDS)
+        (self.__code, self.__name, self.__description, self.__storytelling_creator,
+         self.__graphics_creator, self.__category, self.__price, self.__year) = state
+        self.__text = None
+        self.__links = None
+
     def __str__(self) -> str:
-        """Returns a string representation of the VideoGame instance."""
-        return (
-            f"{'=' * 10}\n"
+        """Returns a string representation of the VideoGame instance, cached until it changes."""
+        if self.__text is None:
+            self.__text = self.to_text()
+        return self.__text
+
+    def to_text(self, high_definition: bool = False) -> str:
+        """This method returns the description of the videogame as text.
+
+        Args:
+            high_definition (bool): True to add the price in high definition.
+
+        Returns:
+            A string with the fields of the videogame.
+        """
+        text = (
+            f"{RULE}\n"
             f"Code: {self.__code}\n"
             f"Name: {self.__name}\n"
             f"Description: {self.__description}\n"
@@ -96,5 +301,113 @@ class VideoGame:
             f"Category: {self.__category}\n"
             f"Price: ${self.__price:.2f}\n"
             f"Year: {self.__year}\n"
-            f"{'=' * 10}"
+            f"{RULE}"
         )
+        if high_definition:
+            text = _with_high_definition_price(text, self.__price)
+        return text
+
+
+class GameVariant:
+    """This class represents a videogame as installed in a machine.
+
+    It only refers to the shared VideoGame and keeps whether it is in
+    high definition, so thousands of machines can hold the same title
+    without copying it. Its price follows the price of the videogame.
+    """
+
+    __slots__ = ("__videogame", "__high_definition")
+
+    def __init__(self, videogame: VideoGame, high_definition: bool = False):
+        self.__videogame = videogame
+        self.__high_definition = high_definition
+
+    def get_videogame(self) -> VideoGame:
+        """This method returns the shared videogame.
+
+        Returns:
+            The VideoGame of the variant.
+        """
+        return self.__videogame
+
+    def is_high_definition(self) -> bool:
+        """This method tells if the videogame is installed in high definition.
+
+        Returns:
+            True if the variant is in high definition.
+        """
+        return self.__high_definition
+
+    def get_code(self) -> int:
+        """This method returns the code of the videogame.
+
+        Returns:
+            An integer with the code of the videogame.
+        """
+        return self.__videogame.get_code()
+
+    def get_name(self) -> str:
+        """This method returns the name of the videogame.
+
+        Returns:
+            A string with the name of the videogame.
+        """
+        return self.__videogame.get_name()
+
+    def get_category(self) -> str:
+        """This method returns the category of the videogame.
+
+        Returns:
+            A string with the category of the videogame.
+        """
+        return self.__videogame.get_category()
+
+    def get_price(self) -> float:
+        """This method returns the price paid for the videogame in the machine.
+
+        Returns:
+            A float with the price of the videogame, in high definition if chosen.
+        """
+        return self.price_for(self.__videogame.get_price())
+
+    def price_for(self, price: float) -> float:
+        """This method returns what the variant costs for a given price of its videogame.
+
+        Args:
+            price (float): Price of the videogame.
+
+        Returns:
+            A float with the price, in high definition if chosen.
+        """
+        return high_definition_price(price) if self.__high_definition else price
+
+    def add_watcher(self, watcher):
+        """This method registers an object to be notified of the price changes of the videogame.
+
+        Args:
+            watcher: Object with a price_changed(videogame, old_price) method.
+        """
+        self.__videogame.add_watcher(watcher)
+
+    def remove_watcher(self, watcher):
+        """This method stops notifying an object of the price changes of the videogame.
+
+        Args:
+            watcher: Object previously registered with add_watcher.
+        """
+        self.__videogame.remove_watcher(watcher)
+
+    def __reduce__(self):
+        return (_load_variant, (self.__videogame, self.__high_definition))
+
+    def __str__(self) -> str:
+        """Returns the cached description of the videogame, with the high definition price if chosen."""
+        text = str(self.__videogame)
+        if self.__high_definition:
+            text = _with_high_definition_price(text, self.__videogame.get_price())
+        return text
+
+
+def _load_variant(videogame: VideoGame, high_definition: bool) -> GameVariant:
+    """Returns the shared variant of an unpickled videogame."""
+    return videogame.variant(high_definition)
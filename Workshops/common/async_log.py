@@ -0,0 +1,197 @@
+"""
+This module has a non-blocking log writer shared by the workshops.
+
+The messages are put in a bounded queue and written by a background
+thread in batches, so logging an error never waits for the disk. When
+the queue is full the message is dropped and counted instead of
+blocking the caller. Every pending message is written when the program
+exits.
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshops.
+
+Workshops is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshops is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshops. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+def get_log(path="log.txt"):
+    """
+    Get the log of a file, shared by every module that logs to the same path.
+
+    Args:
+        path (str): Path of the log file.
+
+    Returns:
+        AsyncLog: The log of the file.
+    """
+    key = os.path.abspath(path)
+    with _logs_lock:
+        if key not in _logs:
+            _logs[key] = AsyncLog(path)
+        return _logs[key]
+
+class AsyncLog():
+    """
+    This class represents a log file written by a background thread.
+
+    The callers only append the date and the message to a deque, which is
+    thread-safe, and wake the thread up. The thread formats and writes
+    every waiting message with a single write per batch.
+    """
+
+    def __init__(self, path="log.txt", max_queue=10_000, batch_size=256):
+        """
+        Initialize the log. The thread and the file are started on the first message.
+
+        Args:
+            path (str): Path of the log file.
+            max_queue (int): Number of messages that can wait to be written.
+            batch_size (int): Maximum number of messages written at once.
+        """
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._registered = False
+        self._dropped = 0
+        self._written = 0
+
+    def log(self, message: str) -> bool:
+        """
+        Queue a message with the current date without waiting for it to be written.
+
+        Args:
+            message (str): The message to log.
+
+        Returns:
+            bool: True if the message was queued, False if it was dropped because the queue is full.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._pending) >= self.max_queue:
+            with self._lock:
+                self._dropped += 1
+            return False
+        self._pending.append((datetime.now(), message))
+        if not self._wake.is_set():
+            self._wake.set()
+        return True
+
+    def get_dropped(self) -> int:
+        """
+        Get the number of messages dropped because the queue was full.
+
+        Returns:
+            int: The number of dropped messages.
+        """
+        return self._dropped
+
+    def get_written(self) -> int:
+        """
+        Get the number of messages written to the file.
+
+        Returns:
+            int: The number of written messages.
+        """
+        return self._written
+
+    def flush(self):
+        """
+        Wait until every message queued before the call has been written to the file.
+
+        Returns:
+            None
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            done = threading.Event()
+            self._pending.append(done)
+            self._wake.set()
+            while not done.wait(0.1) and thread.is_alive():
+                pass
+
+    def close(self):
+        """
+        Write the queued messages and stop the background thread.
+
+        The log can still be used afterwards, a new thread is started on the next message.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            thread, self._thread, self._pid = self._thread, None, None
+        if thread is not None and thread.is_alive():
+            self._pending.append(None)
+            self._wake.set()
+            thread.join()
+
+    def _start(self):
+        """
+        Start the background thread, also in a child process after a fork.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if not self._registered:
+                atexit.register(self.close)
+                self._registered = True
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"AsyncLog({self.path})", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """
+        Write the queued messages in batches until the stop mark (None) is received.
+
+        Events found in the queue are flush requests and are set once the
+        messages before them are written.
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                self._wake.wait()
+                self._wake.clear()
+                batch = []
+                while self._pending:
+                    item = self._pending.popleft()
+                    if isinstance(item, tuple):
+                        batch.append(f"{item[0]} --- {item[1]}\n")
+                        if len(batch) < self.batch_size:
+                            continue
+                    self.__write(f, batch)
+                    batch = []
+                    if item is None:
+                        return
+                    if isinstance(item, threading.Event):
+                        item.set()
+                self.__write(f, batch)
+
+    def __write(self, f, batch):
+        if batch:
+            f.write("".join(batch))
+            f.flush()
+            self._written += len(batch)
@@ -0,0 +1,315 @@
+"""
+This module computes revenue reports from the purchase and sales ledgers.
+
+The purchase history of Workshop 1 (purchase_history.txt) gives the
+revenue by day and the registered machines of Workshop 2
+(registered_machines.txt) give the revenue by category, material and
+color. Both files are read line by line in a single pass and the results
+are kept as rollups in a JSON file together with the offset reached in
+each ledger, so running the report again only reads the lines appended
+since the previous run. Percentiles of the order value come from a
+histogram with logarithmic buckets, which needs constant memory.
+
+Run it from the folder with the ledgers, optionally giving their paths:
+
+    python revenue.py [purchase_history.txt] [registered_machines.txt]
+
+Author: Anderson David Arenas Gutierrez <adarenasg@udistrital.edu.co>
+
+This file is part of Workshops.
+
+Workshops is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as
+published by the Free Software Foundation, either version 3 of
+the License, or (at your option) any later version.
+
+Workshops is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Workshops. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import math
+import os
+import sys
+
+def parse_purchase(line: str):
+    """
+    Get the day and the price of a line of the purchase history.
+
+    Args:
+        line (str): A line such as "2024-10-05 10:00:00.000000 --- Client: Ana, Total Price: $270".
+
+    Returns:
+        tuple: The day as "YYYY-MM-DD" and the price, or None if the line does not follow the format.
+    """
+    date, separator, rest = line.partition(" --- ")
+    _, found, price = rest.rpartition("Total Price: $")
+    if not separator or not found or len(date) < 10:
+        return None
+    try:
+        return date[:10], float(price)
+    except ValueError:
+        return None
+
+def parse_sale(line: str):
+    """
+    Get the fields of a line of the registered machines file.
+
+    The lines are written by ledger.format_machine_line in Workshop 2.
+
+    Args:
+        line (str): A line such as "Dance, Wood, Red, $3650.00".
+
+    Returns:
+        tuple: The category, material, color and price, or None if the line does not follow the format.
+    """
+    parts = line.strip().split(", ")
+    if len(parts) != 4:
+        return None
+    category, material, color, price = parts
+    try:
+        return category.lower(), material.lower(), color.lower(), float(price.replace("$", ""))
+    except ValueError:
+        return None
+
+class Histogram():
+    """
+    This class represents a histogram of prices with logarithmic buckets.
+
+    A price is counted in the bucket floor(log(price) / log(1 + error)),
+    so every percentile is known within the relative error whatever the
+    number of prices, and the histogram stays small.
+    """
+
+    ZERO = -(1 << 30)  # bucket of the prices lower than one cent
+
+    def __init__(self, error=0.01, counts=None):
+        """
+        Initialize the histogram.
+
+        Args:
+            error (float): Relative error of the percentiles.
+            counts (dict): Counts by bucket of a saved histogram.
+        """
+        self.error = error
+        self._base = math.log1p(error)
+        self.counts = {int(bucket): count for bucket, count in (counts or {}).items()}
+        self.total = sum(self.counts.values())
+
+    def add(self, price: float):
+        """
+        Count a price. Prices lower than one cent are counted as zero.
+
+        Args:
+            price (float): The price to count.
+
+        Returns:
+            None
+        """
+        bucket = math.floor(math.log(price) / self._base) if price >= 0.01 else self.ZERO
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+
+    def percentile(self, p: float):
+        """
+        Get a percentile of the counted prices.
+
+        Args:
+            p (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The percentile, or None if no price was counted.
+        """
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                if bucket == self.ZERO:
+                    return 0.0
+                # middle of the bucket, within the relative error of its ends
+                return math.exp((bucket + 0.5) * self._base)
+        return None
+
+    def to_dict(self) -> dict:
+        """
+        Get the histogram as a dictionary that can be saved as JSON.
+
+        Returns:
+            dict: The relative error and the counts by bucket.
+        """
+        return {"error": self.error, "counts": {str(bucket): count for bucket, count in self.counts.items()}}
+
+class RevenueRollup():
+    """
+    This class represents the revenue rollups of the purchase and sales ledgers.
+    """
+
+    def __init__(self, state_path="revenue_rollup.json"):
+        """
+        Initialize the rollups, loading them from the state file if it exists.
+
+        Args:
+            state_path (str): Path of the JSON file with the saved rollups.
+        """
+        self.state_path = state_path
+        self.state = {"purchases": self._empty("purchases"), "sales": self._empty("sales")}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                self.state.update(json.load(f))
+
+    @staticmethod
+    def _empty(source: str) -> dict:
+        """
+        Get the rollups of a ledger that has not been read.
+        """
+        rollup = {"path": None, "inode": None, "offset": 0, "orders": 0, "revenue": 0.0,
+                  "skipped": 0, "histogram": Histogram().to_dict()}
+        if source == "purchases":
+            rollup["by_day"] = {}
+        else:
+            rollup.update(by_category={}, by_material={}, by_color={})
+        return rollup
+
+    def _rollup(self, source: str, path: str) -> dict:
+        """
+        Get the rollups of a ledger, started again if the file was replaced or truncated.
+        """
+        rollup = self.state[source]
+        stat = os.stat(path)
+        if rollup["path"] != os.path.abspath(path) or rollup["inode"] != stat.st_ino \
+                or stat.st_size < rollup["offset"]:
+            rollup = self.state[source] = self._empty(source)
+            rollup["path"], rollup["inode"] = os.path.abspath(path), stat.st_ino
+        return rollup
+
+    @staticmethod
+    def _new_lines(rollup: dict, path: str):
+        """
+        Yield the complete lines appended to a ledger since the last update, moving its offset.
+        """
+        with open(path, "rb") as f:
+            f.seek(rollup["offset"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # the last line is still being written
+                rollup["offset"] += len(line)
+                yield line.decode("utf-8")
+
+    def update(self, purchases_path=None, sales_path=None) -> int:
+        """
+        Add the lines appended to the ledgers since the last update and save the rollups.
+
+        Args:
+            purchases_path (str): Path of the purchase history of Workshop 1, or None to skip it.
+            sales_path (str): Path of the registered machines file of Workshop 2, or None to skip it.
+
+        Returns:
+            int: The number of new orders added.
+        """
+        added = 0
+        if purchases_path is not None and os.path.exists(purchases_path):
+            added += self._add_purchases(purchases_path)
+        if sales_path is not None and os.path.exists(sales_path):
+            added += self._add_sales(sales_path)
+        self.save()
+        return added
+
+    def _add_purchases(self, path: str) -> int:
+        rollup = self._rollup("purchases", path)
+        histogram = Histogram(**rollup["histogram"])
+        by_day = rollup["by_day"]
+        added = 0
+        for line in self._new_lines(rollup, path):
+            purchase = parse_purchase(line)
+            if purchase is None:
+                rollup["skipped"] += line.strip() != ""
+                continue
+            day, price = purchase
+            by_day[day] = by_day.get(day, 0.0) + price
+            histogram.add(price)
+            rollup["revenue"] += price
+            rollup["orders"] += 1
+            added += 1
+        rollup["histogram"] = histogram.to_dict()
+        return added
+
+    def _add_sales(self, path: str) -> int:
+        rollup = self._rollup("sales", path)
+        histogram = Histogram(**rollup["histogram"])
+        added = 0
+        for line in self._new_lines(rollup, path):
+            sale = parse_sale(line)
+            if sale is None:
+                rollup["skipped"] += line.strip() != ""
+                continue
+            category, material, color, price = sale
+            for key, value in (("by_category", category), ("by_material", material), ("by_color", color)):
+                rollup[key][value] = rollup[key].get(value, 0.0) + price
+            histogram.add(price)
+            rollup["revenue"] += price
+            rollup["orders"] += 1
+            added += 1
+        rollup["histogram"] = histogram.to_dict()
+        return added
+
+    def save(self):
+        """
+        Save the rollups in the state file, replacing it only once it is completely written.
+
+        Returns:
+            None
+        """
+        temporary = self.state_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.state_path)
+
+    def percentiles(self, source: str, points=(50, 90, 99)) -> dict:
+        """
+        Get percentiles of the order value of a ledger.
+
+        Args:
+            source (str): "purchases" or "sales".
+            points (tuple): The percentiles to compute.
+
+        Returns:
+            dict: The value of each percentile, None if the ledger has no orders.
+        """
+        histogram = Histogram(**self.state[source]["histogram"])
+        return {p: histogram.percentile(p) for p in points}
+
+    def report(self) -> str:
+        """
+        Get the rollups as text.
+
+        Returns:
+            str: The report.
+        """
+        lines = []
+        for source, title, groups in (("purchases", "Purchases (Workshop 1)", ("by_day",)),
+                                      ("sales", "Registered machines (Workshop 2)",
+                                       ("by_category", "by_material", "by_color"))):
+            rollup = self.state[source]
+            lines.append(f"{title}: {rollup['orders']} orders, revenue ${rollup['revenue']:.2f}")
+            for p, value in self.percentiles(source).items():
+                if value is not None:
+                    lines.append(f"  p{p} order value: ${value:.2f}")
+            for group in groups:
+                lines.append(f"  Revenue {group.replace('_', ' ')}:")
+                for key, revenue in sorted(rollup[group].items()):
+                    lines.append(f"    {key}: ${revenue:.2f}")
+        return "\n".join(lines)
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:] + ["purchase_history.txt", "registered_machines.txt"][len(sys.argv) - 1:]
+    rollup = RevenueRollup()
+    print(f"{rollup.update(arguments[0], arguments[1])} new orders read.")
+    print(rollup.report())